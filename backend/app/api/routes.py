@@ -3,30 +3,47 @@ from __future__ import annotations
 import asyncio
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
+from app.core.config import settings
+from app.core.metrics import render_prometheus
+from app.core.profiling import recent_profiles
 from app.data.connectors import get_connector
-from app.regime.detector import detect_regime
-from app.recommendation.engine import recommend
-from app.schemas.models import AssetRecommendation, RecommendationRequest
-from app.strategies.generator import base_strategies, optimize_parameters
+from app.data.ohlcv import OHLCV
+from app.research.pipeline import cached_research, research_executor, scan_job
+from app.schemas.models import AssetRecommendation, RecommendationEvent, RecommendationRequest, ScanRequest
 
 router = APIRouter(prefix="/api", tags=["research"])
 
 
 @router.get("/health")
 async def health() -> dict:
-    return {"status": "ok"}
+    from app.data import ingestion
 
+    service = ingestion.ingestion_service
+    if service is None:
+        return {"status": "ok"}
+    live = service.health()
+    return {"status": "ok" if live["running"] and live["feed_error"] is None else "degraded", "ingestion": live}
 
-@router.post("/recommendations", response_model=list[AssetRecommendation])
-async def recommendations(payload: RecommendationRequest) -> list[AssetRecommendation]:
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    return render_prometheus()
+
+
+@router.get("/metrics/profiles")
+async def slow_request_profiles() -> list[dict]:
+    return list(recent_profiles)
+
+
+async def _fetch_frames(payload: ScanRequest) -> list[OHLCV]:
     connector = get_connector(payload.market)
-    specs = base_strategies()
 
     fetch_jobs = [connector.fetch_ohlcv(asset, payload.timeframe, payload.lookback_bars) for asset in payload.assets]
     fetched = await asyncio.gather(*fetch_jobs, return_exceptions=True)
 
-    out: list[AssetRecommendation] = []
+    frames = []
     for asset, result in zip(payload.assets, fetched, strict=True):
         if isinstance(result, Exception):
             raise HTTPException(status_code=400, detail=f"Failed to load {asset}: {result}") from result
@@ -34,22 +51,76 @@ async def recommendations(payload: RecommendationRequest) -> list[AssetRecommend
         df = result
         if df.empty:
             raise HTTPException(status_code=400, detail=f"No data for {asset}")
+        frames.append(df)
+    return frames
+
+
+@router.post("/recommendations", response_model=list[AssetRecommendation])
+async def recommendations(payload: RecommendationRequest) -> list[AssetRecommendation]:
+    frames = await _fetch_frames(payload)
+    timeout = payload.timeout_s or settings.research_timeout_s
+    jobs = [_research(asset, payload, df) for asset, df in zip(payload.assets, frames, strict=True)]
+    try:
+        return await asyncio.wait_for(asyncio.gather(*jobs), timeout)
+    except asyncio.TimeoutError as exc:
+        raise HTTPException(status_code=504, detail=f"Research timed out after {timeout:g}s") from exc
+
+
+@router.post("/recommendations/stream", response_class=StreamingResponse)
+async def recommendations_stream(payload: RecommendationRequest) -> StreamingResponse:
+    """Like ``/recommendations`` but streamed as NDJSON ``RecommendationEvent`` lines.
+
+    Each asset is written as soon as it finishes, in completion order; failures and
+    timeouts are reported inline instead of failing the whole request.
+    """
+    timeout = payload.timeout_s or settings.research_timeout_s
+    return StreamingResponse(_stream_events(payload, timeout), media_type="application/x-ndjson")
+
+
+async def _asset_event(asset: str, payload: RecommendationRequest, connector) -> RecommendationEvent:
+    try:
+        df = await connector.fetch_ohlcv(asset, payload.timeframe, payload.lookback_bars)
+    except Exception as exc:
+        return RecommendationEvent(asset=asset, status="error", error=f"Failed to load {asset}: {exc}")
+    if df.empty:
+        return RecommendationEvent(asset=asset, status="error", error=f"No data for {asset}")
+    try:
+        return RecommendationEvent(asset=asset, status="ok", result=await _research(asset, payload, df))
+    except Exception as exc:
+        return RecommendationEvent(asset=asset, status="error", error=f"Research failed for {asset}: {exc}")
+
+
+async def _stream_events(payload: RecommendationRequest, timeout: float):
+    connector = get_connector(payload.market)
+    pending = {asyncio.ensure_future(_asset_event(asset, payload, connector)): asset for asset in payload.assets}
+    deadline = asyncio.get_running_loop().time() + timeout
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=deadline - asyncio.get_running_loop().time(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                del pending[task]
+                yield task.result().model_dump_json() + "\n"
+        for asset in pending.values():
+            yield RecommendationEvent(asset=asset, status="error", error=f"Research timed out after {timeout:g}s").model_dump_json() + "\n"
+    finally:
+        # Runs on client disconnect too; cancelling drops this request's interest in the shared computations.
+        for task in pending:
+            task.cancel()
+
+
+@router.post("/recommendations/scan", response_model=list[AssetRecommendation])
+async def scan(payload: ScanRequest) -> list[AssetRecommendation]:
+    """Default-parameter strategies ranked for every asset in one panel pass, for scanning large universes."""
+    frames = await _fetch_frames(payload)
+    timeout = payload.timeout_s or settings.research_timeout_s
+    job = scan_job(payload.market, payload.timeframe, dict(zip(payload.assets, frames, strict=True)))
+    try:
+        return await asyncio.wait_for(research_executor.run(job), timeout)
+    except asyncio.TimeoutError as exc:
+        raise HTTPException(status_code=504, detail=f"Scan timed out after {timeout:g}s") from exc
+
 
-        def objective(signal):
-            returns = signal.shift(1).fillna(0) * df["close"].pct_change().fillna(0)
-            return float(returns.mean() / (returns.std() + 1e-9))
-
-        optimized_specs = [optimize_parameters(df, spec, objective, n_trials=10) for spec in specs]
-        regime = detect_regime(df)
-        top = recommend(df, payload.timeframe, regime, optimized_specs)
-        out.append(
-            AssetRecommendation(
-                asset=asset,
-                market=payload.market,
-                timeframe=payload.timeframe,
-                detected_regime=regime,
-                top_strategies=top,
-            )
-        )
-
-    return out
+async def _research(asset: str, payload: RecommendationRequest, df) -> AssetRecommendation:
+    return await cached_research(payload.market, asset, payload.timeframe, df, payload.evaluation, payload.n_folds)
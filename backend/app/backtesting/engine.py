@@ -1,49 +1,423 @@
 from __future__ import annotations
 
+import math
+
 import numpy as np
 import pandas as pd
 
+from app.core.config import settings
+from app.core.metrics import timed
+from app.data.ohlcv import OHLCV
+
+BATCH_COLUMNS = 256
+# Signals are -1/0/1; one byte each keeps a (bars x candidates) matrix 8x smaller than int64/float64.
+SIGNAL_DTYPE = np.int8
+# Fraction of (bar, column) cells with a position change below which trading costs
+# are charged by scattering onto the change points rather than by a dense pass.
+SPARSE_TURNOVER = 0.05
+
 
 def _annualization_factor(timeframe: str) -> int:
     return {"1m": 525600, "5m": 105120, "1h": 8760, "1d": 252, "1w": 52}.get(timeframe, 252)
 
 
-def backtest(df: pd.DataFrame, signal: pd.Series, timeframe: str, transaction_cost_bps: float, slippage_bps: float, position_size: float = 1.0) -> dict:
-    prices = df["close"].astype(float)
-    returns = prices.pct_change().fillna(0)
-    shifted_signal = signal.shift(1).fillna(0)
-    trades = shifted_signal.diff().abs().fillna(0)
+def price_returns(close: np.ndarray) -> np.ndarray:
+    close = np.asarray(close, dtype=float)
+    returns = np.zeros_like(close)
+    if len(close) > 1:
+        np.divide(close[1:], close[:-1], out=returns[1:])
+        returns[1:] -= 1
+    return returns
+
+
+def as_signals(signals) -> np.ndarray:
+    """``signals`` as an array that supports arithmetic; boolean (long/flat) signals become int8."""
+    signals = np.asarray(signals)
+    return signals.astype(SIGNAL_DTYPE) if signals.dtype == bool else signals
+
+
+def _charge_trades(strat: np.ndarray, positions: np.ndarray, initial: np.ndarray | float, total_cost: float) -> np.ndarray:
+    """Subtract trading costs from ``strat`` in place; returns the position changes per column.
+
+    A trade happens where the position differs from the bar before (bar 0 from
+    ``initial``). When those change points are rare the costs are scattered onto
+    just them; busier strategies take one dense int8 turnover pass instead.
+    ``strat`` must be C-contiguous.
+    """
+    changed = np.empty(positions.shape, dtype=bool)
+    np.not_equal(positions[:1], initial, out=changed[:1])
+    np.not_equal(positions[1:], positions[:-1], out=changed[1:])
+    if np.count_nonzero(changed) <= SPARSE_TURNOVER * changed.size:
+        flat = np.flatnonzero(changed)
+        values = positions.reshape(-1)
+        width = math.prod(positions.shape[1:])
+        trades = np.bincount(flat % width, minlength=width) if positions.ndim == 2 else np.array(len(flat))
+        before = values[flat - width].astype(float)
+        first = flat < width
+        before[first] = np.broadcast_to(initial, positions.shape[1:]).reshape(-1)[flat[first]]
+        size = np.abs(values[flat] - before)
+        size *= total_cost
+        strat.reshape(-1)[flat] -= size
+    else:
+        turnover = np.empty(positions.shape, dtype=positions.dtype)
+        np.subtract(positions[:1], initial, out=turnover[:1], casting="unsafe")
+        np.subtract(positions[1:], positions[:-1], out=turnover[1:])
+        np.abs(turnover, out=turnover)
+        strat -= np.multiply(turnover, total_cost)
+        trades = np.count_nonzero(changed, axis=0)
+    return trades
+
+
+def _strategy_returns(
+    returns: np.ndarray,
+    signals: np.ndarray,
+    transaction_cost_bps: float,
+    slippage_bps: float,
+    position_size: float = 1.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    signals = as_signals(signals)
+    if returns.ndim == 1 and signals.ndim == 2:
+        returns = returns[:, None]
+    # Positions are the previous bar's signals, kept in the signals' (compact) dtype.
+    positions = np.zeros(signals.shape, dtype=signals.dtype)
+    positions[1:] = signals[:-1]
+    strat = np.empty(signals.shape)
+    np.multiply(positions, returns, out=strat)
+    strat *= position_size
+    trades = _charge_trades(strat, positions, 0, (transaction_cost_bps + slippage_bps) / 10000)
+    return strat, trades
+
+
+def strategy_returns(
+    returns: np.ndarray,
+    signals: np.ndarray,
+    transaction_cost_bps: float,
+    slippage_bps: float,
+    position_size: float = 1.0,
+) -> np.ndarray:
+    """Per-bar strategy returns for a (bars x strategies) signal matrix.
+
+    ``returns`` is either shared by every column (1-D) or per column (2-D).
+    Costs are charged only at the bars where a position changes.
+    """
+    return _strategy_returns(returns, signals, transaction_cost_bps, slippage_bps, position_size)[0]
+
+
+def _direction(score: np.ndarray) -> np.ndarray:
+    return np.where(score > 0.2, "long", np.where(score < -0.2, "short", "neutral")).astype(object)
+
+
+def batch_metrics(strat_returns: np.ndarray, ann: int, direction_score: np.ndarray | None = None) -> dict:
+    """Columnar backtest metrics for a (bars x strategies) matrix of strategy returns."""
+    n = strat_returns.shape[0]
+    equity = np.cumprod(1 + strat_returns, axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if n > 1:
+            cagr = equity[-1] ** (ann / n) - 1
+        else:
+            cagr = np.zeros(strat_returns.shape[1:])
+        mean = strat_returns.mean(axis=0) if n else np.full(strat_returns.shape[1:], np.nan)
+        vol = strat_returns.std(axis=0, ddof=1) * np.sqrt(ann) if n > 1 else np.full(strat_returns.shape[1:], np.nan)
+
+        neg = strat_returns < 0
+        pos = strat_returns > 0
+        n_neg = neg.sum(axis=0)
+        n_pos = pos.sum(axis=0)
+        loss_sum = np.where(neg, strat_returns, 0).sum(axis=0)
+        win_sum = np.where(pos, strat_returns, 0).sum(axis=0)
+        neg_mean = loss_sum / n_neg
+        downside = np.sqrt(np.where(neg, (strat_returns - neg_mean) ** 2, 0).sum(axis=0) / (n_neg - 1))
+        downside = np.where(n_neg > 1, downside, np.nan) * np.sqrt(ann)
+
+        sharpe = np.where((vol != 0) & ~np.isnan(vol), mean * ann / vol, 0.0)
+        sortino = np.where((downside != 0) & ~np.isnan(downside), mean * ann / downside, 0.0)
+
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+        max_dd = drawdown.min(axis=0) if n else np.zeros(strat_returns.shape[1:])
+
+        win_rate = n_pos / np.maximum(n_pos + n_neg, 1)
+        profit_factor = np.where(loss_sum != 0, win_sum / np.abs(loss_sum), np.inf)
+    profit_factor = np.where(np.isfinite(profit_factor), profit_factor, 10.0)
+
+    out = {
+        "cagr": np.asarray(cagr, dtype=float),
+        "sharpe": np.asarray(sharpe, dtype=float),
+        "sortino": np.asarray(sortino, dtype=float),
+        "max_drawdown": np.asarray(max_dd, dtype=float),
+        "win_rate": np.asarray(win_rate, dtype=float),
+        "profit_factor": np.asarray(profit_factor, dtype=float),
+    }
+    if direction_score is not None:
+        out["direction"] = _direction(direction_score)
+    return out
+
+
+class StreamingBacktest:
+    """``backtest_batch`` metrics for prices and signals fed in consecutive chunks.
+
+    Running state (last close and position, equity, peak and worst drawdown,
+    Welford mean/variance of all and of losing returns, win/loss sums and counts)
+    carries across chunks, so memory is bounded by the chunk size however long the
+    history. Equity and drawdown are chained exactly; means and deviations are
+    merged per chunk and match the in-memory results to rounding. With
+    ``equity_every`` the equity of every ``equity_every``-th bar (and the last) is
+    kept as a downsampled curve.
+    """
+
+    def __init__(
+        self,
+        n_columns: int,
+        timeframe: str,
+        transaction_cost_bps: float,
+        slippage_bps: float,
+        position_size: float = 1.0,
+        equity_every: int | None = None,
+    ) -> None:
+        self.ann = _annualization_factor(timeframe)
+        self.total_cost = (transaction_cost_bps + slippage_bps) / 10000
+        self.position_size = position_size
+        self.equity_every = equity_every
+        self.bars = 0
+        self.last_close: np.ndarray | None = None
+        self.last_signal = np.zeros(n_columns, dtype=np.int8)
+        self.position = np.zeros(n_columns, dtype=np.int8)
+        self.trades = np.zeros(n_columns, dtype=np.int64)
+        self.equity = np.ones(n_columns)
+        self.peak = np.ones(n_columns)
+        self.max_dd = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.n_neg = np.zeros(n_columns)
+        self.neg_mean = np.zeros(n_columns)
+        self.neg_m2 = np.zeros(n_columns)
+        self.n_pos = np.zeros(n_columns)
+        self.win_sum = np.zeros(n_columns)
+        self.loss_sum = np.zeros(n_columns)
+        self.tail = np.empty((0, n_columns))
+        self.curve: list[np.ndarray] = []
+        self.curve_bars: list[np.ndarray] = []
+
+    def _returns(self, close: np.ndarray) -> np.ndarray:
+        returns = np.empty(close.shape)
+        if self.last_close is None:
+            returns[:1] = 0.0
+        else:
+            np.divide(close[:1], self.last_close, out=returns[:1])
+            returns[:1] -= 1
+        np.divide(close[1:], close[:-1], out=returns[1:])
+        returns[1:] -= 1
+        self.last_close = close[-1:].copy()
+        return returns if returns.ndim == 2 else returns[:, None]
+
+    def update(self, close: np.ndarray, signals: np.ndarray) -> None:
+        """Feed the next bars: ``close`` 1-D or (bars x columns), ``signals`` (bars x columns)."""
+        close = np.asarray(close, dtype=float)
+        signals = as_signals(signals)
+        if signals.ndim == 1:
+            signals = signals[:, None]
+        n = len(signals)
+        if n == 0:
+            return
+        returns = self._returns(close)
+
+        # Positions are signals shifted by one bar, continuing from the previous chunk.
+        positions = np.empty(signals.shape, dtype=signals.dtype)
+        positions[0] = self.last_signal
+        positions[1:] = signals[:-1]
+        strat = np.empty(signals.shape)
+        np.multiply(positions, returns, out=strat)
+        strat *= self.position_size
+        self.trades += _charge_trades(strat, positions, self.position, self.total_cost)
+        self.last_signal = signals[-1].copy()
+        self.position = positions[-1].copy()
+        self._accumulate(strat)
+
+        # Equity and peaks are chained from the previous chunk's last values, so they match one long cumprod.
+        equity = np.empty((n + 1, signals.shape[1]))
+        equity[0] = self.equity
+        np.add(strat, 1, out=equity[1:])
+        np.cumprod(equity, axis=0, out=equity)
+        peak = np.maximum.accumulate(np.vstack([self.peak, equity[1:]]), axis=0)[1:]
+        np.minimum(self.max_dd, (equity[1:] / peak - 1).min(axis=0), out=self.max_dd)
+        self.equity, self.peak = equity[-1].copy(), peak[-1].copy()
+        if self.equity_every:
+            first = -self.bars % self.equity_every
+            self.curve.append(equity[1 + first :: self.equity_every].copy())
+            self.curve_bars.append(np.arange(self.bars + first, self.bars + n, self.equity_every))
+
+        self.tail = np.vstack([self.tail, signals[-20:]])[-20:]
+        self.bars += n
+
+    def _accumulate(self, strat: np.ndarray) -> None:
+        n = len(strat)
+        total = self.bars + n
+        mean = strat.mean(axis=0)
+        delta = mean - self.mean
+        self.m2 += ((strat - mean) ** 2).sum(axis=0) + delta**2 * self.bars * n / total
+        self.mean += delta * n / total
+
+        neg = strat < 0
+        pos = strat > 0
+        n_neg = neg.sum(axis=0)
+        loss = np.where(neg, strat, 0).sum(axis=0)
+        self.n_pos += pos.sum(axis=0)
+        self.win_sum += np.where(pos, strat, 0).sum(axis=0)
+        self.loss_sum += loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            neg_mean = np.where(n_neg > 0, loss / n_neg, 0.0)
+            neg_m2 = np.where(neg, (strat - neg_mean) ** 2, 0).sum(axis=0)
+            neg_total = self.n_neg + n_neg
+            delta = neg_mean - self.neg_mean
+            merged = neg_total > 0
+            self.neg_m2 += np.where(merged, neg_m2 + delta**2 * self.n_neg * n_neg / neg_total, 0.0)
+            self.neg_mean += np.where(merged, delta * n_neg / neg_total, 0.0)
+        self.n_neg = neg_total
+
+    def metrics(self) -> dict:
+        """Metrics over every bar fed so far, keyed like ``backtest_batch``."""
+        n, ann = self.bars, self.ann
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cagr = self.equity ** (ann / n) - 1 if n > 1 else np.zeros_like(self.equity)
+            mean = self.mean if n else np.full_like(self.mean, np.nan)
+            vol = np.sqrt(self.m2 / (n - 1)) * np.sqrt(ann) if n > 1 else np.full_like(self.mean, np.nan)
+            downside = np.where(self.n_neg > 1, np.sqrt(self.neg_m2 / (self.n_neg - 1)), np.nan) * np.sqrt(ann)
+            sharpe = np.where((vol != 0) & ~np.isnan(vol), mean * ann / vol, 0.0)
+            sortino = np.where((downside != 0) & ~np.isnan(downside), mean * ann / downside, 0.0)
+            profit_factor = np.where(self.loss_sum != 0, self.win_sum / np.abs(self.loss_sum), np.inf)
+        out = {
+            "cagr": np.asarray(cagr, dtype=float),
+            "sharpe": np.asarray(sharpe, dtype=float),
+            "sortino": np.asarray(sortino, dtype=float),
+            "max_drawdown": self.max_dd.copy(),
+            "win_rate": self.n_pos / np.maximum(self.n_pos + self.n_neg, 1),
+            "profit_factor": np.where(np.isfinite(profit_factor), profit_factor, 10.0),
+            "direction": _direction(self.tail.mean(axis=0) if len(self.tail) else np.full(self.tail.shape[1], np.nan)),
+            "trades": self.trades.copy(),
+        }
+        if self.equity_every:
+            bars = np.concatenate(self.curve_bars) if self.curve_bars else np.empty(0, dtype=np.int64)
+            curve = np.vstack(self.curve) if self.curve else np.empty((0, len(self.equity)))
+            if n and (not len(bars) or bars[-1] != n - 1):
+                bars, curve = np.append(bars, n - 1), np.vstack([curve, self.equity])
+            out["equity"], out["equity_bars"] = curve, bars
+        return out
+
+
+@timed("backtest_chunked")
+def backtest_chunked(
+    close: np.ndarray,
+    signals: np.ndarray,
+    timeframe: str,
+    transaction_cost_bps: float,
+    slippage_bps: float,
+    position_size: float = 1.0,
+    chunk_bars: int | None = None,
+    equity_every: int | None = None,
+) -> dict:
+    """``backtest_batch`` in ``chunk_bars`` x ``BATCH_COLUMNS`` tiles through ``StreamingBacktest``.
+
+    ``close`` and ``signals`` may be memory-mapped (e.g. ``CandleStore`` columns);
+    only one tile of either is read and expanded at a time. Each block of
+    ``BATCH_COLUMNS`` columns is streamed through its own ``StreamingBacktest``, so
+    temporaries are bounded by the tile however long or wide the grid.
+    ``chunk_bars`` defaults to ``Settings.backtest_chunk_bars``.
+    """
+    chunk_bars = settings.backtest_chunk_bars if chunk_bars is None else chunk_bars
+    signals_2d = signals[:, None] if signals.ndim == 1 else signals
+    parts: list[dict] = []
+    for col in range(0, signals_2d.shape[1], BATCH_COLUMNS):
+        block = signals_2d[:, col : col + BATCH_COLUMNS]
+        block_close = close[:, col : col + BATCH_COLUMNS] if np.ndim(close) == 2 else close
+        state = StreamingBacktest(block.shape[1], timeframe, transaction_cost_bps, slippage_bps, position_size, equity_every)
+        for start in range(0, len(block), chunk_bars):
+            state.update(block_close[start : start + chunk_bars], block[start : start + chunk_bars])
+        parts.append(state.metrics())
+    if not parts:
+        return {}
+    out = {key: np.concatenate([p[key] for p in parts]) for key in parts[0] if key not in ("equity", "equity_bars")}
+    if equity_every:
+        out["equity"], out["equity_bars"] = np.hstack([p["equity"] for p in parts]), parts[0]["equity_bars"]
+    return out
+
 
-    total_cost = (transaction_cost_bps + slippage_bps) / 10000
-    strat_returns = shifted_signal * returns * position_size - trades * total_cost
-    equity = (1 + strat_returns).cumprod()
+@timed("backtest")
+def backtest_batch(
+    close: np.ndarray,
+    signals: np.ndarray,
+    timeframe: str,
+    transaction_cost_bps: float,
+    slippage_bps: float,
+    position_size: float = 1.0,
+    return_equity: bool = False,
+) -> dict:
+    """Backtest every column of a (bars x strategies) signal matrix.
 
+    ``close`` is either one price series whose returns are computed once and shared
+    by every column, or a (bars x strategies) matrix pairing each signal column
+    with its own prices (e.g. one strategy across the assets of a panel). Columns
+    are processed in blocks of ``BATCH_COLUMNS`` so temporaries stay bounded for
+    wide grids. Signals are best passed as int8 (as the generator produces them);
+    they are never expanded to floats beyond the strategy returns themselves.
+    Returns a dict of 1-D metric arrays indexed by column, including ``trades``,
+    the number of position changes.
+    """
+    signals = as_signals(signals)
+    if signals.ndim == 1:
+        signals = signals[:, None]
+    if len(signals) > settings.backtest_chunk_bars and not return_equity:
+        # Long histories: bounded memory instead of several full (bars x strategies) temporaries.
+        if np.ndim(close) == 2 and np.shape(close) != signals.shape:
+            raise ValueError(f"close {np.shape(close)} and signals {signals.shape} must have the same shape")
+        return backtest_chunked(close, signals, timeframe, transaction_cost_bps, slippage_bps, position_size)
+    returns = price_returns(close)
+    if returns.ndim == 2 and returns.shape != signals.shape:
+        raise ValueError(f"close {returns.shape} and signals {signals.shape} must have the same shape")
     ann = _annualization_factor(timeframe)
-    cagr = equity.iloc[-1] ** (ann / len(equity)) - 1 if len(equity) > 1 else 0.0
-    vol = strat_returns.std() * np.sqrt(ann)
-    downside = strat_returns[strat_returns < 0].std() * np.sqrt(ann)
-    sharpe = ((strat_returns.mean() * ann) / vol) if vol and not np.isnan(vol) else 0.0
-    sortino = ((strat_returns.mean() * ann) / downside) if downside and not np.isnan(downside) else 0.0
 
-    rolling_max = equity.cummax()
-    drawdown = equity / rolling_max - 1
-    max_dd = drawdown.min() if len(drawdown) else 0.0
+    parts: list[dict] = []
+    equity_parts: list[np.ndarray] = []
+    for start in range(0, signals.shape[1], BATCH_COLUMNS):
+        block = signals[:, start : start + BATCH_COLUMNS]
+        block_returns = returns if returns.ndim == 1 else returns[:, start : start + BATCH_COLUMNS]
+        strat_returns, trades = _strategy_returns(block_returns, block, transaction_cost_bps, slippage_bps, position_size)
+        direction_score = block[-20:].mean(axis=0) if len(block) else np.full(block.shape[1], np.nan)
+        parts.append(batch_metrics(strat_returns, ann, direction_score) | {"trades": trades})
+        if return_equity:
+            equity_parts.append(np.cumprod(1 + strat_returns, axis=0))
 
-    wins = strat_returns[strat_returns > 0]
-    losses = strat_returns[strat_returns < 0]
-    win_rate = (len(wins) / max(len(wins) + len(losses), 1))
-    profit_factor = (wins.sum() / abs(losses.sum())) if losses.sum() != 0 else float("inf")
+    out = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]} if parts else {}
+    if return_equity:
+        out["equity"] = np.hstack(equity_parts) if equity_parts else np.empty((len(signals), 0))
+    return out
 
-    direction_score = signal.tail(20).mean()
-    direction = "long" if direction_score > 0.2 else "short" if direction_score < -0.2 else "neutral"
 
+def backtest(
+    df: OHLCV | pd.DataFrame,
+    signal: pd.Series | np.ndarray,
+    timeframe: str,
+    transaction_cost_bps: float,
+    slippage_bps: float,
+    position_size: float = 1.0,
+    equity_every: int = 1,
+) -> dict:
+    """Single-strategy backtest; ``equity_every > 1`` runs it chunked and keeps every n-th bar of the equity curve."""
+    close = np.asarray(df["close"], dtype=float)
+    values = np.asarray(signal)
+    if equity_every > 1:
+        metrics = backtest_chunked(close, values, timeframe, transaction_cost_bps, slippage_bps, position_size, equity_every=equity_every)
+        equity = pd.Series(metrics["equity"][:, 0], index=df.index[metrics["equity_bars"]])
+    else:
+        metrics = backtest_batch(close, values, timeframe, transaction_cost_bps, slippage_bps, position_size, return_equity=True)
+        equity = pd.Series(metrics["equity"][:, 0], index=df.index)
     return {
-        "cagr": float(cagr),
-        "sharpe": float(sharpe),
-        "sortino": float(sortino),
-        "max_drawdown": float(max_dd),
-        "win_rate": float(win_rate),
-        "profit_factor": float(profit_factor if np.isfinite(profit_factor) else 10.0),
-        "direction": direction,
+        "cagr": float(metrics["cagr"][0]),
+        "sharpe": float(metrics["sharpe"][0]),
+        "sortino": float(metrics["sortino"][0]),
+        "max_drawdown": float(metrics["max_drawdown"][0]),
+        "win_rate": float(metrics["win_rate"][0]),
+        "profit_factor": float(metrics["profit_factor"][0]),
+        "direction": metrics["direction"][0],
+        "trades": int(metrics["trades"][0]),
         "equity": equity,
     }
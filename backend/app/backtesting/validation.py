@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from app.backtesting.engine import _annualization_factor, batch_metrics, strategy_returns
+from app.strategies.generator import StrategyEvaluator, StrategySpec
+
+
+@dataclass(frozen=True)
+class Fold:
+    train: tuple[slice, ...]
+    test: slice
+
+
+def walk_forward_folds(n_bars: int, n_folds: int, purge: int = 0) -> list[Fold]:
+    """Expanding-window folds: fold k trains on everything before its test block, minus ``purge`` bars."""
+    block = n_bars // (n_folds + 1)
+    if block == 0:
+        return []
+    folds = []
+    for k in range(1, n_folds + 1):
+        test = slice(k * block, (k + 1) * block if k < n_folds else n_bars)
+        folds.append(Fold(train=(slice(0, max(test.start - purge, 0)),), test=test))
+    return folds
+
+
+def purged_kfold_folds(n_bars: int, n_folds: int, purge: int = 0, embargo: int = 0) -> list[Fold]:
+    """K contiguous test blocks; training drops ``purge`` bars before and ``embargo`` bars after each test block."""
+    block = n_bars // n_folds
+    if block == 0:
+        return []
+    folds = []
+    for k in range(n_folds):
+        test = slice(k * block, (k + 1) * block if k < n_folds - 1 else n_bars)
+        train = (slice(0, max(test.start - purge, 0)), slice(min(test.stop + embargo, n_bars), n_bars))
+        folds.append(Fold(train=tuple(s for s in train if s.stop > s.start), test=test))
+    return folds
+
+
+def make_folds(mode: str, n_bars: int, n_folds: int, purge: int) -> list[Fold]:
+    if mode == "walk_forward":
+        return walk_forward_folds(n_bars, n_folds, purge)
+    if mode == "purged_kfold":
+        return purged_kfold_folds(n_bars, n_folds, purge, embargo=purge)
+    return []
+
+
+def out_of_sample_metrics(
+    evaluator: StrategyEvaluator,
+    timeframe: str,
+    folds: list[Fold],
+    tune: Callable[[tuple[slice, ...]], StrategySpec],
+    transaction_cost_bps: float,
+    slippage_bps: float,
+) -> dict | None:
+    """Tune on each fold's training bars and backtest on its test bars.
+
+    ``tune(segments)`` returns the spec tuned on those bars. Returns and
+    indicators are computed once over the whole series by ``evaluator``; each
+    fold costs a tuning run plus slices of full-length strategy returns, which are
+    reused across folds that settle on the same parameters. Metrics are taken
+    over the concatenated out-of-sample segments.
+    """
+    if not folds:
+        return None
+    by_params: dict[tuple, np.ndarray] = {}
+    pieces = []
+    for fold in folds:
+        fold_spec = tune(fold.train)
+        key = tuple(sorted(fold_spec.params.items()))
+        strat = by_params.get(key)
+        if strat is None:
+            signal = evaluator.signals(fold_spec.params)
+            strat = by_params[key] = strategy_returns(evaluator.returns, signal[:, None], transaction_cost_bps, slippage_bps)
+        pieces.append(strat[fold.test])
+
+    metrics = batch_metrics(np.concatenate(pieces), _annualization_factor(timeframe))
+    return {key: float(values[0]) for key, values in metrics.items()} | {"folds": len(folds)}
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
 
@@ -7,6 +9,49 @@ class Settings(BaseModel):
     default_timeframes: list[str] = ["1m", "5m", "1h", "1d", "1w"]
     transaction_cost_bps: float = 5.0
     slippage_bps: float = 2.0
+    indicator_cache_bytes: int = 256 * 1024 * 1024
+    research_executor: Literal["thread", "process", "inline"] = "thread"
+    research_workers: int | None = None
+    research_timeout_s: float = 120.0
+    research_parallel_strategies: bool = False
+    candle_store_enabled: bool = True
+    candle_store_dir: str | None = None
+    binance_base_url: str = "https://api.binance.com"
+    binance_ws_url: str = "wss://stream.binance.com:9443"
+    binance_weight_per_minute: int = 1200
+    exchange_max_concurrency: int = 8
+    http_max_retries: int = 3
+    http_timeout_s: float = 15.0
+    regime_max_age_s: float = 6 * 3600
+    regime_refit_bars: int = 24
+    optuna_trials: int = 10
+    optuna_n_jobs: int = 1
+    optuna_prune: bool = False
+    optuna_batch_size: int = 1
+    optuna_storage: str | None = None
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = False
+    profiling_enabled: bool = False
+    slow_request_ms: float = 2000.0
+    recommendation_cache_entries: int = 512
+    validation_purge_bars: int = 10
+    backtest_chunk_bars: int = 65536
+    kernels_use_numba: bool = True
+    ingestion_enabled: bool = False
+    ingestion_feed: Literal["binance", "replay"] = "binance"
+    ingestion_symbols: list[str] = ["BTCUSDT"]
+    ingestion_timeframes: list[str] = ["1m", "1h"]
+    ingestion_history_bars: int = 2000
+    ingestion_max_streams: int = 200
+    ingestion_auto_track: bool = True
+    ingestion_replay_delay_s: float = 1.0
+    warmup_enabled: bool = False
+    warmup_delay_s: float = 1.0
+    warmup_prefetch_bars: int = 500
+    scheduler_enabled: bool = False
+    scheduler_max_concurrency: int = 2
+    scheduler_lookback_bars: int = 500
+    scheduler_delay_s: float = 2.0
 
 
 settings = Settings()
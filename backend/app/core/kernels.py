@@ -0,0 +1,254 @@
+"""Allocation-light rolling-window kernels shared by indicators and regime detection.
+
+All kernels take float64 arrays that are 1-D or 2-D (bars x series) and work along
+axis 0, returning NaN wherever pandas' ``rolling(window)`` would (warm-up rows and
+windows containing NaN). Rolling moments use a Numba loop with pandas' add/remove
+updates when Numba is installed, and a blocked, re-centred cumulative-sum
+formulation otherwise.
+"""
+from __future__ import annotations
+
+import functools
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+MOMENT_BLOCK = 4096
+
+# Numba is an optional accelerator. It is imported and the loops compiled on first use
+# (or by the start-up warm-up), which keeps it off the API's import path.
+USE_NUMBA = settings.kernels_use_numba and importlib.util.find_spec("numba") is not None
+
+
+def as_float_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def diff(x: np.ndarray) -> np.ndarray:
+    out = np.empty_like(x)
+    out[:1] = np.nan
+    np.subtract(x[1:], x[:-1], out=out[1:])
+    return out
+
+
+def _as_2d(x: np.ndarray) -> np.ndarray:
+    return x.reshape(x.shape[0], -1)
+
+
+def _constant_windows(x: np.ndarray, window: int) -> np.ndarray:
+    """Rows ``window - 1:`` flagged where the trailing window holds one repeated value.
+
+    pandas returns such windows' mean and variance exactly (value and 0); matching
+    that keeps e.g. ``down == 0`` tests in RSI identical to the batch results.
+    """
+    runs = np.zeros(x.shape, dtype=np.int64)
+    np.cumsum(x[1:] == x[:-1], axis=0, out=runs[1:])
+    return (runs[window - 1 :] - runs[: x.shape[0] - window + 1]) == window - 1
+
+
+def _moments_numpy(x: np.ndarray, window: int, ddof: int) -> tuple[np.ndarray, np.ndarray]:
+    n = x.shape[0]
+    mean = np.full(x.shape, np.nan)
+    var = np.full(x.shape, np.nan)
+    nan = np.isnan(x)
+    # Sums are taken over deviations from a per-block reference value, which keeps the
+    # cumulative sums small and the variance free of catastrophic cancellation.
+    for start in range(window - 1, n, MOMENT_BLOCK):
+        stop = min(n, start + MOMENT_BLOCK)
+        seg = x[start - window + 1 : stop]
+        seg_nan = nan[start - window + 1 : stop]
+        ref = np.where(np.isnan(seg[window - 1]), 0.0, seg[window - 1])
+        dev = np.where(seg_nan, 0.0, seg - ref)
+
+        sums = np.zeros((len(seg) + 1,) + seg.shape[1:])
+        np.cumsum(dev, axis=0, out=sums[1:])
+        s1 = sums[window:] - sums[:-window]
+        np.multiply(dev, dev, out=dev)
+        np.cumsum(dev, axis=0, out=sums[1:])
+        s2 = sums[window:] - sums[:-window]
+        counts = np.zeros(sums.shape, dtype=np.int64)
+        np.cumsum(seg_nan, axis=0, out=counts[1:])
+        incomplete = (counts[window:] - counts[:-window]) > 0
+
+        m = ref + s1 / window
+        v = np.maximum(s2 - s1 * s1 / window, 0.0) / (window - ddof) if window > ddof else np.full(s1.shape, np.nan)
+        m[incomplete] = np.nan
+        v[incomplete] = np.nan
+        mean[start:stop] = m
+        var[start:stop] = v
+    const = _constant_windows(x, window)
+    mean[window - 1 :][const] = x[window - 1 :][const]
+    var[window - 1 :][const] = 0.0
+    return mean, var
+
+
+def _moments_loop(x, window, ddof):  # pragma: no cover - compiled by numba
+    # Rows outer, columns inner: (bars x assets) panels are C-ordered, so this walks memory sequentially.
+    n, cols = x.shape
+    mean = np.full((n, cols), np.nan)
+    var = np.full((n, cols), np.nan)
+    count = np.zeros(cols, dtype=np.int64)
+    nans = np.zeros(cols, dtype=np.int64)
+    run = np.zeros(cols, dtype=np.int64)
+    mu = np.zeros(cols)
+    ssq = np.zeros(cols)
+    for i in range(n):
+        for col in range(cols):
+            if i >= window:
+                old = x[i - window, col]
+                if np.isnan(old):
+                    nans[col] -= 1
+                else:
+                    count[col] -= 1
+                    if count[col] == 0:
+                        mu[col] = 0.0
+                        ssq[col] = 0.0
+                    else:
+                        delta = old - mu[col]
+                        mu[col] -= delta / count[col]
+                        ssq[col] -= delta * (old - mu[col])
+            value = x[i, col]
+            run[col] = run[col] + 1 if i > 0 and value == x[i - 1, col] else 1
+            if np.isnan(value):
+                nans[col] += 1
+            else:
+                count[col] += 1
+                delta = value - mu[col]
+                mu[col] += delta / count[col]
+                ssq[col] += delta * (value - mu[col])
+            if i >= window - 1 and nans[col] == 0:
+                if run[col] >= window:
+                    mean[i, col] = value
+                    if window > ddof:
+                        var[i, col] = 0.0
+                else:
+                    mean[i, col] = mu[col]
+                    if window > ddof:
+                        var[i, col] = max(ssq[col], 0.0) / (window - ddof)
+    return mean, var
+
+
+def _ewm_loop(x, alpha):  # pragma: no cover - compiled by numba
+    # pandas' adjust=False, ignore_na=False recursion, step for step, so results match it exactly.
+    n, cols = x.shape
+    out = np.empty((n, cols))
+    if n == 0:
+        return out
+    weighted = x[0].copy()
+    old_wt = np.ones(cols)
+    for col in range(cols):
+        out[0, col] = weighted[col]
+    for i in range(1, n):
+        for col in range(cols):
+            cur = x[i, col]
+            observed = not np.isnan(cur)
+            if not np.isnan(weighted[col]):
+                old_wt[col] *= 1.0 - alpha
+                if observed:
+                    if weighted[col] != cur:
+                        weighted[col] = (old_wt[col] * weighted[col] + alpha * cur) / (old_wt[col] + alpha)
+                    old_wt[col] = 1.0
+            elif observed:
+                weighted[col] = cur
+            out[i, col] = weighted[col]
+    return out
+
+
+@functools.cache
+def _jit(fn):
+    import numba
+
+    return numba.njit(cache=True, nogil=True)(fn)
+
+
+def compile_kernels() -> None:
+    """Compile (or load from Numba's on-disk cache) the JIT loops ahead of the first request."""
+    x = np.linspace(1.0, 2.0, 64)
+    rolling_moments(x, 14)
+    ewm_mean(x, 14)
+
+
+def ewm_mean(x: np.ndarray, span: int) -> np.ndarray:
+    """``ewm(span=span, adjust=False).mean()`` along axis 0."""
+    if USE_NUMBA:
+        return _jit(_ewm_loop)(_as_2d(x), 2.0 / (span + 1)).reshape(x.shape)
+    return pd.DataFrame(_as_2d(x)).ewm(span=span, adjust=False).mean().to_numpy().reshape(x.shape)
+
+
+def rolling_moments(x: np.ndarray, window: int, ddof: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and variance in one pass."""
+    if x.shape[0] < window:
+        return np.full(x.shape, np.nan), np.full(x.shape, np.nan)
+    if USE_NUMBA:
+        mean, var = _jit(_moments_loop)(_as_2d(x), window, ddof)
+        return mean.reshape(x.shape), var.reshape(x.shape)
+    return _moments_numpy(x, window, ddof)
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    if USE_NUMBA or x.shape[0] < window:
+        return rolling_moments(x, window)[0]
+    # Means alone are well conditioned, so a single global cumulative sum is enough.
+    nan = np.isnan(x)
+    has_nan = nan.any()
+    sums = np.zeros((x.shape[0] + 1,) + x.shape[1:])
+    np.cumsum(np.where(nan, 0.0, x) if has_nan else x, axis=0, out=sums[1:])
+    out = np.full(x.shape, np.nan)
+    window_sums = out[window - 1 :]
+    np.subtract(sums[window:], sums[:-window], out=window_sums)
+    window_sums /= window
+    const = _constant_windows(x, window)
+    window_sums[const] = x[window - 1 :][const]
+    if has_nan:
+        counts = np.zeros(sums.shape, dtype=np.int64)
+        np.cumsum(nan, axis=0, out=counts[1:])
+        window_sums[(counts[window:] - counts[:-window]) > 0] = np.nan
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    return np.sqrt(rolling_moments(x, window, ddof)[1])
+
+
+def _rolling_extreme(x: np.ndarray, window: int, ufunc: np.ufunc, identity: float) -> np.ndarray:
+    # van Herk / Gil-Werman: per-block prefix and suffix extremes give any window's
+    # extreme from two lookups, so the cost is O(n) regardless of window length.
+    n = x.shape[0]
+    out = np.full(x.shape, np.nan)
+    if n < window:
+        return out
+    if window == 1:
+        out[:] = x
+        return out
+    n_blocks = -(-n // window)
+    padded = np.full((n_blocks * window,) + x.shape[1:], identity)
+    padded[:n] = x
+    blocks = padded.reshape((n_blocks, window) + x.shape[1:])
+    prefix = ufunc.accumulate(blocks, axis=1).reshape(padded.shape)
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    ufunc(suffix[: n - window + 1], prefix[window - 1 : n], out=out[window - 1 :])
+    return out
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    return _rolling_extreme(x, window, np.maximum, -np.inf)
+
+
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    return _rolling_extreme(x, window, np.minimum, np.inf)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """max(high - low, |high - prev close|, |low - prev close|); the first bar uses high - low."""
+    tr = np.subtract(high, low)
+    gap = np.empty_like(tr[1:])
+    np.subtract(high[1:], close[:-1], out=gap)
+    np.abs(gap, out=gap)
+    np.fmax(tr[1:], gap, out=tr[1:])
+    np.subtract(low[1:], close[:-1], out=gap)
+    np.abs(gap, out=gap)
+    np.fmax(tr[1:], gap, out=tr[1:])
+    return tr
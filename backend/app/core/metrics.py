@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from app.core.config import settings
+
+STAGE_BUCKETS_S = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request stage timings for the Server-Timing header; None when the request did not opt in.
+request_timings: ContextVar[dict[str, list[float]] | None] = ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...] = STAGE_BUCKETS_S) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            i += 1
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        out, running = [], 0
+        for bound, n in zip([*map(repr, self.buckets), "+Inf"], self.counts):
+            running += n
+            out.append((bound, running))
+        return out
+
+
+class MetricsRegistry:
+    """Process-wide stage timing histograms; recording is skipped entirely when disabled."""
+
+    def __init__(self, enabled: bool = settings.metrics_enabled) -> None:
+        self.enabled = enabled
+        self.stages: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        hist = self.stages.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(stage, Histogram())
+        hist.observe(seconds)
+
+
+registry = MetricsRegistry()
+
+
+def _record(stage: str, seconds: float, timings: dict[str, list[float]] | None) -> None:
+    if registry.enabled:
+        registry.observe(stage, seconds)
+    if timings is not None:
+        timings.setdefault(stage, []).append(seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    timings = request_timings.get()
+    if not registry.enabled and timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - started, timings)
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Record the wall time of each call to the decorated (sync or async) function under ``stage``."""
+
+    def decorate(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                timings = request_timings.get()
+                if not registry.enabled and timings is None:
+                    return await fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _record(stage, time.perf_counter() - started, timings)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timings = request_timings.get()
+            if not registry.enabled and timings is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(stage, time.perf_counter() - started, timings)
+
+        return wrapper
+
+    return decorate
+
+
+def server_timing_header(timings: dict[str, list[float]]) -> str:
+    return ", ".join(
+        f'{stage};dur={sum(values) * 1000:.2f};desc="{len(values)} calls"' for stage, values in sorted(timings.items())
+    )
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus() -> str:
+    from app.data import ingestion
+    from app.data.http import LATENCY_BUCKETS_S, session_stats
+    from app.recommendation.cache import recommendation_cache
+    from app.research import scheduler
+    from app.strategies.indicators import indicator_cache
+
+    lines = [
+        "# HELP research_stage_seconds Wall time spent in research pipeline stages.",
+        "# TYPE research_stage_seconds histogram",
+    ]
+    for stage, hist in sorted(registry.stages.items()):
+        for bound, count in hist.cumulative():
+            lines.append(f"research_stage_seconds_bucket{_labels(stage=stage, le=bound)} {count}")
+        lines.append(f"research_stage_seconds_sum{_labels(stage=stage)} {hist.sum}")
+        lines.append(f"research_stage_seconds_count{_labels(stage=stage)} {hist.count}")
+
+    stats = session_stats()
+    lines += [
+        "# HELP exchange_request_seconds Latency of exchange REST requests.",
+        "# TYPE exchange_request_seconds histogram",
+    ]
+    for exchange, s in sorted(stats.items()):
+        running = 0
+        for bound, n in zip([*map(repr, LATENCY_BUCKETS_S), "+Inf"], s.latency_buckets):
+            running += n
+            lines.append(f"exchange_request_seconds_bucket{_labels(exchange=exchange, le=bound)} {running}")
+        lines.append(f"exchange_request_seconds_sum{_labels(exchange=exchange)} {s.latency_total_s}")
+        lines.append(f"exchange_request_seconds_count{_labels(exchange=exchange)} {s.requests}")
+    for name, attr, help_text in [
+        ("exchange_request_errors_total", "errors", "Failed exchange requests, including retried ones."),
+        ("exchange_request_retries_total", "retries", "Retried exchange requests."),
+    ]:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        lines += [f"{name}{_labels(exchange=exchange)} {getattr(s, attr)}" for exchange, s in sorted(stats.items())]
+
+    cache = indicator_cache.stats()
+    for key, kind in [("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge"), ("bytes", "gauge")]:
+        name = f"indicator_cache_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# TYPE {name} {kind}", f"{name} {cache[key]}"]
+
+    service = ingestion.ingestion_service
+    if service is not None:
+        live = service.stats()
+        for key, kind in [("hits", "counter"), ("misses", "counter"), ("candles", "counter"), ("reconnects", "counter"), ("feed_failures", "counter"), ("streams", "gauge")]:
+            name = f"ingestion_{key}" + ("_total" if kind == "counter" else "")
+            lines += [f"# TYPE {name} {kind}", f"{name} {live[key]}"]
+
+    results = recommendation_cache.stats()
+    for key, kind in [("hits", "counter"), ("misses", "counter"), ("shared", "counter"), ("entries", "gauge")]:
+        name = f"recommendation_cache_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# TYPE {name} {kind}", f"{name} {results[key]}"]
+
+    if scheduler.recommendation_scheduler is not None:
+        scheduled = scheduler.recommendation_scheduler.stats()
+        for key, kind in [("runs", "counter"), ("failures", "counter"), ("deduplicated", "counter"), ("queued", "gauge")]:
+            name = f"scheduler_{key}" + ("_total" if kind == "counter" else "")
+            lines += [f"# TYPE {name} {kind}", f"{name} {scheduled[key]}"]
+    return "\n".join(lines) + "\n"
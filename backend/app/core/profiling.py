@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of one request's threads at a fixed interval.
+
+    Those are the thread that started the profiler and, while they run the
+    request's work, pool threads entered through ``in_request_context``. The
+    starting thread is the event loop, so its samples include whatever other
+    requests run on the loop meanwhile; process-pool workers are not sampled.
+    Stacks are kept in collapsed form (``file:func;file:func``) with sample counts,
+    which is what flame-graph tools consume.
+    """
+
+    def __init__(self, interval_s: float = 0.005) -> None:
+        self.interval_s = interval_s
+        self.samples: Counter[str] = Counter()
+        self._threads: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def attach(self) -> None:
+        """Sample the calling thread until the matching ``detach``."""
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def detach(self) -> None:
+        with self._lock:
+            ident = threading.get_ident()
+            self._threads[ident] -= 1
+            if not self._threads[ident]:
+                del self._threads[ident]
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            with self._lock:
+                threads = set(self._threads)
+            for ident, frame in sys._current_frames().items():
+                if ident not in threads:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self.attach()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+
+active_profiler: ContextVar[SamplingProfiler | None] = ContextVar("active_profiler", default=None)
+
+
+def _run_attached(fn: Callable, args: tuple, kwargs: dict):
+    profiler = active_profiler.get()
+    if profiler is None:
+        return fn(*args, **kwargs)
+    profiler.attach()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.detach()
+
+
+def in_request_context(fn: Callable) -> Callable:
+    """``fn`` bound to the caller's contextvars, for running in pool threads.
+
+    Executor threads do not inherit contextvars, so without this the request's
+    ``Server-Timing`` misses stages timed there and its profiler does not sample
+    them. Every call runs in its own copy of the context, so the wrapper may be
+    called from several threads at once.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return context.copy().run(_run_attached, fn, args, kwargs)
+
+    return run
+
+
+SlowRequestHook = Callable[[dict], None]
+
+recent_profiles: deque[dict] = deque(maxlen=20)
+_hooks: list[SlowRequestHook] = []
+
+
+def register_slow_request_hook(hook: SlowRequestHook) -> None:
+    _hooks.append(hook)
+
+
+def _keep_recent(profile: dict) -> None:
+    recent_profiles.append(profile)
+    top = ", ".join(f"{stack.rsplit(';', 1)[-1]} x{n}" for stack, n in Counter(profile["samples"]).most_common(3))
+    logger.warning("slow request %s %s took %.0f ms; hottest frames: %s", profile["method"], profile["path"], profile["duration_ms"], top)
+
+
+register_slow_request_hook(_keep_recent)
+
+
+def report_slow_request(method: str, path: str, duration_s: float, samples: Counter[str]) -> None:
+    profile = {
+        "method": method,
+        "path": path,
+        "duration_ms": duration_s * 1000,
+        "captured_at": time.time(),
+        "samples": dict(samples.most_common(200)),
+    }
+    for hook in _hooks:
+        hook(profile)
@@ -0,0 +1,66 @@
+"""Optional background warm-up, started with the API when ``warmup_enabled`` is set.
+
+optuna, scikit-learn and httpx load on first use and the Numba kernels compile on
+first call, which keeps them off the start-up path. The warm-up pays those costs
+right after the server comes up instead of on the first research request, then
+starts the research pool (so forked workers inherit the loaded state) and
+prefetches candles for the default universe of the settings store.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_compute(df) -> None:
+    from app.core.kernels import compile_kernels
+    from app.regime.detector import detect_regime
+    from app.strategies.generator import OPTIMIZABLE, StrategyEvaluator, base_strategies, generate_signals, optimize_parameters
+
+    compile_kernels()
+    for spec in base_strategies():
+        generate_signals(df, spec, cache=None)
+    detect_regime(df)
+    tunable = next(spec for spec in base_strategies() if spec.name in OPTIMIZABLE)
+    optimize_parameters(StrategyEvaluator(df, tunable, cache=None), n_trials=2)
+
+
+async def _prefetch() -> None:
+    from app.data.connectors import get_connector
+    from app.settings.store import get_settings_store
+
+    store = await asyncio.to_thread(get_settings_store)
+    assets = store.get("default_assets") or []
+    connector = get_connector(store.get("default_market", "crypto"))
+    fetched = await asyncio.gather(
+        *(connector.fetch_ohlcv(asset, store.get("default_timeframe", "1h"), settings.warmup_prefetch_bars) for asset in assets),
+        return_exceptions=True,
+    )
+    for asset, result in zip(assets, fetched, strict=True):
+        if isinstance(result, Exception):
+            logger.warning("warm-up prefetch of %s failed: %s", asset, result)
+
+
+async def warm_up() -> None:
+    # Start once the server is accepting connections, so none of this delays the first health check.
+    await asyncio.sleep(settings.warmup_delay_s)
+    started = time.perf_counter()
+    try:
+        from app.data.connectors import SyntheticConnector
+
+        df = await SyntheticConnector("warmup").fetch_ohlcv("WARMUP", "1h", 300)
+        await asyncio.to_thread(_warm_compute, df)
+        from app.research.pipeline import research_executor
+
+        await asyncio.to_thread(research_executor.start)
+        if settings.warmup_prefetch_bars:
+            await _prefetch()
+    except Exception:
+        logger.exception("warm-up failed")
+        return
+    logger.info("warm-up finished in %.1f s", time.perf_counter() - started)
@@ -1,56 +1,166 @@
 from __future__ import annotations
 
+import time
+import zlib
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from pathlib import Path
 
-import httpx
 import numpy as np
 import pandas as pd
 
+from app.core.config import settings
+from app.core.metrics import timed
+from app.data.http import binance_session
+from app.data.ohlcv import OHLCV
+from app.data.store import STORE_DIR, CandleStore, empty_candles
+
 
 @dataclass
 class BaseConnector:
     name: str
 
-    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> pd.DataFrame:
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> OHLCV:
         raise NotImplementedError
 
 
+KLINES_PAGE_LIMIT = 1000
+INTERVAL_MS = {"1m": 60_000, "5m": 300_000, "1h": 3_600_000, "1d": 86_400_000, "1w": 604_800_000}
+
+
+def _parse_klines(rows: list[list]) -> dict[str, np.ndarray]:
+    if not rows:
+        return empty_candles()
+    candles = {
+        "open_time": np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+        "close_time": np.fromiter((r[6] for r in rows), dtype=np.int64, count=len(rows)),
+    }
+    for i, col in enumerate(["open", "high", "low", "close", "volume"], start=1):
+        candles[col] = np.array([r[i] for r in rows], dtype=float)
+    valid = np.isfinite(np.column_stack([candles[c] for c in ["open", "high", "low", "close", "volume"]])).all(axis=1)
+    if not valid.all():
+        candles = {col: values[valid] for col, values in candles.items()}
+    return candles
+
+
+def _concat(pages: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    if not pages:
+        return empty_candles()
+    return {col: np.concatenate([p[col] for p in pages]) for col in pages[0]}
+
+
+def _klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    return 5
+
+
 class BinanceConnector(BaseConnector):
     def __init__(self) -> None:
         super().__init__(name="binance")
 
-    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> pd.DataFrame:
-        interval_map = {"1m": "1m", "5m": "5m", "1h": "1h", "1d": "1d", "1w": "1w"}
-        interval = interval_map.get(timeframe, "1h")
-        url = "https://api.binance.com/api/v3/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": min(limit, 1000)}
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(url, params=params)
-            r.raise_for_status()
-            rows = r.json()
-
-        df = pd.DataFrame(
-            rows,
-            columns=[
-                "open_time",
-                "open",
-                "high",
-                "low",
-                "close",
-                "volume",
-                "close_time",
-                "quote_asset_volume",
-                "number_of_trades",
-                "taker_buy_base_asset_volume",
-                "taker_buy_quote_asset_volume",
-                "ignore",
-            ],
-        )
-        df["timestamp"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-        for col in ["open", "high", "low", "close", "volume"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-        return df[["timestamp", "open", "high", "low", "close", "volume"]].dropna()
+    @staticmethod
+    def interval(timeframe: str) -> str:
+        return {"1m": "1m", "5m": "5m", "1h": "1h", "1d": "1d", "1w": "1w"}.get(timeframe, "1h")
+
+    async def fetch_klines(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_time: int | None = None,
+        end_time: int | None = None,
+        limit: int = KLINES_PAGE_LIMIT,
+    ) -> dict[str, np.ndarray]:
+        params = {"symbol": symbol, "interval": self.interval(timeframe), "limit": min(limit, KLINES_PAGE_LIMIT)}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        rows = await binance_session().get_json("/api/v3/klines", params, weight=_klines_weight(params["limit"]))
+        return _parse_klines(rows)
+
+    async def fetch_history(self, symbol: str, timeframe: str, limit: int, end_time: int | None = None) -> dict[str, np.ndarray]:
+        """Latest ``limit`` candles up to ``end_time``, paging backwards past the per-request cap."""
+        pages: list[dict[str, np.ndarray]] = []
+        remaining = limit
+        while remaining > 0:
+            requested = min(remaining, KLINES_PAGE_LIMIT)
+            page = await self.fetch_klines(symbol, timeframe, end_time=end_time, limit=requested)
+            n = len(page["open_time"])
+            if n:
+                pages.insert(0, page)
+            remaining -= n
+            if n < requested:
+                break
+            end_time = int(page["open_time"][0]) - 1
+        return _concat(pages)
+
+    async def fetch_since(self, symbol: str, timeframe: str, start_time: int) -> dict[str, np.ndarray]:
+        """All candles opening at or after ``start_time``, paging forwards."""
+        pages: list[dict[str, np.ndarray]] = []
+        while True:
+            page = await self.fetch_klines(symbol, timeframe, start_time=start_time)
+            if len(page["open_time"]):
+                pages.append(page)
+            if len(page["open_time"]) < KLINES_PAGE_LIMIT:
+                break
+            start_time = int(page["open_time"][-1]) + 1
+        return _concat(pages)
+
+    @timed("fetch_ohlcv")
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> OHLCV:
+        return OHLCV.from_candles(await self.fetch_history(symbol, timeframe, limit))
+
+
+class StoredConnector(BaseConnector):
+    """Serves candles from the local ``CandleStore``, fetching only what it is missing.
+
+    Newer closed candles are pulled from ``source`` once a full interval has passed
+    since the last stored ``close_time``; shorter-than-requested histories are
+    backfilled until the exchange runs out of older candles, which the store
+    remembers. The still-forming candle is never stored or returned.
+    """
+
+    def __init__(self, source: BinanceConnector, store: CandleStore) -> None:
+        super().__init__(name=source.name)
+        self.source = source
+        self.store = store
+
+    @timed("fetch_ohlcv")
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> OHLCV:
+        interval = self.source.interval(timeframe)
+        async with self.store.lock(self.name, symbol, interval):
+            await self._sync(symbol, interval, limit)
+        candles = self.store.read(self.name, symbol, interval)
+        return OHLCV.from_candles({col: values[-limit:] for col, values in candles.items()})
+
+    async def _sync(self, symbol: str, interval: str, limit: int) -> None:
+        now = int(time.time() * 1000)
+        stored = self.store.read(self.name, symbol, interval)
+
+        def closed(candles: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+            keep = candles["close_time"] < now
+            return {col: values[keep] for col, values in candles.items()}
+
+        if not len(stored["open_time"]):
+            fetched = await self.source.fetch_history(symbol, interval, limit + 1)
+            self.store.append(self.name, symbol, interval, closed(fetched))
+            if len(fetched["open_time"]) < limit + 1:
+                self.store.mark_complete(self.name, symbol, interval)
+            return
+
+        if now > int(stored["close_time"][-1]) + INTERVAL_MS[interval]:
+            newer = await self.source.fetch_since(symbol, interval, int(stored["close_time"][-1]) + 1)
+            self.store.append(self.name, symbol, interval, closed(newer))
+
+        missing = limit - len(stored["open_time"])
+        if missing > 0 and not self.store.is_complete(self.name, symbol, interval):
+            older = await self.source.fetch_history(symbol, interval, missing, end_time=int(stored["open_time"][0]) - 1)
+            self.store.prepend(self.name, symbol, interval, older)
+            if len(older["open_time"]) < missing:
+                self.store.mark_complete(self.name, symbol, interval)
 
 
 class SyntheticConnector(BaseConnector):
@@ -59,34 +169,38 @@ class SyntheticConnector(BaseConnector):
     def __init__(self, name: str) -> None:
         super().__init__(name=name)
 
-    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> pd.DataFrame:
-        np.random.seed(abs(hash((self.name, symbol, timeframe))) % 2**32)
+    @timed("fetch_ohlcv")
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> OHLCV:
+        # crc32 rather than hash(): str hashes are salted per process, which made the series non-reproducible.
+        np.random.seed(zlib.crc32(f"{self.name}:{symbol}:{timeframe}".encode()))
         freq = {"1m": "1min", "5m": "5min", "1h": "1h", "1d": "1D", "1w": "1W"}.get(timeframe, "1h")
-        end = datetime.now(timezone.utc)
-        idx = pd.date_range(end=end, periods=limit, freq=freq)
+        # Anchor to the last bar boundary so repeat calls within a bar return identical frames.
+        end = pd.Timestamp(datetime.now(timezone.utc))
+        end = end.floor(freq) if freq != "1W" else end.normalize()
+        timestamp = pd.date_range(end=end, periods=limit, freq=freq).as_unit("ms").asi8
         noise = np.random.normal(0, 0.003, limit)
         trend = np.linspace(-0.03, 0.03, limit)
         returns = noise + trend / limit
-        close = 100 * (1 + pd.Series(returns)).cumprod()
+        close = np.cumprod(1 + returns)
+        close *= 100
         high = close * (1 + np.random.uniform(0, 0.005, limit))
         low = close * (1 - np.random.uniform(0, 0.005, limit))
-        open_ = close.shift(1).fillna(close.iloc[0])
+        open_ = np.empty_like(close)
+        open_[:1] = close[:1]
+        open_[1:] = close[:-1]
         volume = np.random.randint(100, 1000, limit)
-        return pd.DataFrame(
-            {
-                "timestamp": idx,
-                "open": open_.values,
-                "high": high.values,
-                "low": low.values,
-                "close": close.values,
-                "volume": volume,
-            }
-        )
+        return OHLCV(timestamp, open_, high, low, close, volume)
+
+
+candle_store = CandleStore(Path(settings.candle_store_dir) if settings.candle_store_dir else STORE_DIR)
 
 
 def get_connector(market: str) -> BaseConnector:
     if market == "crypto":
-        return BinanceConnector()
+        from app.data.ingestion import LiveConnector, ingestion_service
+
+        connector = StoredConnector(BinanceConnector(), candle_store) if settings.candle_store_enabled else BinanceConnector()
+        return LiveConnector(ingestion_service, connector) if ingestion_service is not None else connector
     if market == "forex":
         return SyntheticConnector("oanda")
     return SyntheticConnector("cme")
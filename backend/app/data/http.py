@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import random
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+RETRY_STATUSES = {418, 429, 500, 502, 503, 504}
+LATENCY_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class TokenBucket:
+    """Request-weight budget refilled continuously over a one-minute window."""
+
+    def __init__(self, capacity: int, per_seconds: float = 60.0) -> None:
+        self.capacity = float(capacity)
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight: float) -> None:
+        weight = min(weight, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+    def observe_used(self, used: float) -> None:
+        """Clamp the local budget to what the exchange reports as already used."""
+        self._refill()
+        self.tokens = min(self.tokens, max(self.capacity - used, 0.0))
+
+
+@dataclass
+class RequestStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    latency_total_s: float = 0.0
+    latency_max_s: float = 0.0
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_S) + 1))
+
+    def observe(self, seconds: float) -> None:
+        self.requests += 1
+        self.latency_total_s += seconds
+        self.latency_max_s = max(self.latency_max_s, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS_S):
+            if seconds <= bound:
+                self.latency_buckets[i] += 1
+                return
+        self.latency_buckets[-1] += 1
+
+
+@dataclass
+class _LoopClient:
+    """A client with the semaphore and weight budget of one event loop."""
+
+    client: httpx.AsyncClient
+    semaphore: asyncio.Semaphore
+    bucket: TokenBucket
+
+
+class ExchangeSession:
+    """Shared keep-alive HTTP client for one exchange.
+
+    Bounds in-flight requests with a semaphore, spends request weight from a token
+    bucket kept in sync with the exchange's used-weight header, and retries
+    throttled, server-side and transport failures with exponential backoff.
+    ``max_concurrency``, ``max_retries`` and ``timeout_s`` default to the
+    ``Settings`` values when the session is created; ``transport`` (e.g. an
+    ``httpx.MockTransport``) replaces the network for tests and stub servers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        max_concurrency: int | None = None,
+        weight_per_minute: int = 1200,
+        weight_header: str | None = None,
+        max_retries: int | None = None,
+        backoff_s: float = 0.5,
+        timeout_s: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.name = name
+        self.base_url = base_url
+        self.max_concurrency = settings.exchange_max_concurrency if max_concurrency is None else max_concurrency
+        self.weight_per_minute = weight_per_minute
+        self.weight_header = weight_header
+        self.max_retries = settings.http_max_retries if max_retries is None else max_retries
+        self.backoff_s = backoff_s
+        self.timeout_s = settings.http_timeout_s if timeout_s is None else timeout_s
+        self.transport = transport
+        self.stats = RequestStats()
+        self._clients: dict[asyncio.AbstractEventLoop, _LoopClient] = {}
+
+    def _bind(self) -> _LoopClient:
+        # asyncio primitives and pooled connections belong to one event loop, so each loop gets its own client.
+        loop = asyncio.get_running_loop()
+        bound = self._clients.get(loop)
+        if bound is None:
+            import httpx  # loaded with the first exchange request rather than at API start-up
+
+            # Clients of loops that have been closed can no longer be awaited; their connections went with the loop.
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_s,
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+                transport=self.transport,
+            )
+            bound = self._clients[loop] = _LoopClient(client, asyncio.Semaphore(self.max_concurrency), TokenBucket(self.weight_per_minute))
+        return bound
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None) -> float:
+        if response is not None and "retry-after" in response.headers:
+            try:
+                return float(response.headers["retry-after"])
+            except ValueError:
+                pass
+        return self.backoff_s * 2**attempt * (1 + random.random() / 2)
+
+    async def get_json(self, path: str, params: dict | None = None, weight: float = 1):
+        import httpx
+
+        bound = self._bind()
+        for attempt in range(self.max_retries + 1):
+            await bound.bucket.acquire(weight)
+            response: httpx.Response | None = None
+            async with bound.semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await bound.client.get(path, params=params)
+                except httpx.TransportError:
+                    self.stats.errors += 1
+                    if attempt == self.max_retries:
+                        raise
+                else:
+                    self.stats.observe(time.perf_counter() - started)
+                    if self.weight_header and self.weight_header in response.headers:
+                        bound.bucket.observe_used(float(response.headers[self.weight_header]))
+                    if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                        if response.is_error:
+                            self.stats.errors += 1
+                        response.raise_for_status()
+                        return response.json()
+                    self.stats.errors += 1
+            self.stats.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def aclose(self) -> None:
+        """Close the client of every event loop this session has been used from."""
+        current = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for loop, bound in clients.items():
+            if loop is current:
+                await bound.client.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(bound.client.aclose(), loop))
+
+
+_sessions: dict[str, ExchangeSession] = {}
+
+
+def binance_session() -> ExchangeSession:
+    session = _sessions.get("binance")
+    if session is None:
+        session = _sessions["binance"] = ExchangeSession(
+            "binance",
+            settings.binance_base_url,
+            weight_per_minute=settings.binance_weight_per_minute,
+            weight_header="x-mbx-used-weight-1m",
+        )
+    return session
+
+
+def session_stats() -> dict[str, RequestStats]:
+    return {name: session.stats for name, session in _sessions.items()}
+
+
+async def close_sessions() -> None:
+    for session in _sessions.values():
+        await session.aclose()
@@ -0,0 +1,414 @@
+"""Live candle ingestion: kline feeds kept in per-(symbol, timeframe) ring buffers.
+
+``IngestionService`` backfills each tracked series over REST, then appends closed
+candles pushed by a feed (Binance kline websockets, or ``ReplayFeed`` for tests
+and offline runs). ``LiveConnector`` serves ``fetch_ohlcv`` from those buffers
+while they are current and falls back to its wrapped connector otherwise.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Iterable, Mapping, Protocol
+
+import numpy as np
+
+from app.core.config import settings
+from app.data.connectors import INTERVAL_MS, BaseConnector, BinanceConnector
+from app.data.ohlcv import OHLCV
+from app.data.store import CANDLE_COLUMNS, CandleStore
+
+try:
+    import websockets
+except ImportError:  # installed with uvicorn[standard]; only the live Binance feed needs it
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+Key = tuple[str, str]
+Candles = dict[str, np.ndarray]
+
+# A closed candle counts as current until this long after the next one should have closed.
+FRESHNESS_GRACE_MS = 5_000
+
+
+class RingBuffer:
+    """Fixed-capacity candle history in preallocated arrays.
+
+    Every row is written twice, at slot ``i`` and ``i + capacity``, so the latest
+    ``n`` rows are always one contiguous slice and ``latest`` returns read-only
+    views instead of copies. A view stays intact for ``capacity - n`` further
+    appends.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.size = 0
+        self._head = 0
+        self._data = {col: np.zeros(2 * capacity, dtype=dtype) for col, dtype in CANDLE_COLUMNS.items()}
+
+    def _last(self, col: str):
+        return self._data[col][self._head - 1 + self.capacity] if self.size else None
+
+    @property
+    def last_open_time(self) -> int | None:
+        value = self._last("open_time")
+        return None if value is None else int(value)
+
+    @property
+    def last_close_time(self) -> int | None:
+        value = self._last("close_time")
+        return None if value is None else int(value)
+
+    def extend(self, candles: Mapping[str, np.ndarray]) -> int:
+        """Append candles newer than the last one; a repeat of the last candle overwrites it."""
+        last = self.last_open_time
+        if last is not None:
+            open_time = candles["open_time"]
+            repeat = np.flatnonzero(open_time == last)
+            if len(repeat):
+                slot = (self._head - 1) % self.capacity
+                for col, arr in self._data.items():
+                    arr[slot] = arr[slot + self.capacity] = candles[col][repeat[-1]]
+            newer = open_time > last
+            if not newer.all():
+                candles = {col: values[newer] for col, values in candles.items()}
+
+        n = len(candles["open_time"])
+        if n > self.capacity:
+            candles = {col: values[-self.capacity :] for col, values in candles.items()}
+            n = self.capacity
+        cap, head = self.capacity, self._head
+        first = min(n, cap - head)
+        for col, arr in self._data.items():
+            values = candles[col]
+            arr[head : head + first] = arr[head + cap : head + cap + first] = values[:first]
+            arr[: n - first] = arr[cap : cap + n - first] = values[first:]
+        self._head = (head + n) % cap
+        self.size = min(self.size + n, cap)
+        return n
+
+    def latest(self, n: int) -> Candles:
+        n = min(n, self.size)
+        end = self._head + self.capacity
+        out = {}
+        for col, arr in self._data.items():
+            view = arr[end - n : end]
+            view.flags.writeable = False
+            out[col] = view
+        return out
+
+
+class CandleFeed(Protocol):
+    """Push source of closed candles for subscribed series."""
+
+    reconnects: int
+
+    def subscribe(self, symbol: str, timeframe: str) -> None: ...
+
+    def events(self) -> AsyncIterator[tuple[str, str, Candles]]: ...
+
+    def now_ms(self) -> int: ...
+
+
+def _parse_kline_message(raw: str | bytes) -> tuple[str, str, Candles] | None:
+    message = json.loads(raw)
+    kline = message.get("data", message).get("k")
+    if not kline or not kline.get("x"):
+        return None  # subscription acks and updates to the still-forming candle
+    candles = {
+        "open_time": np.array([kline["t"]], dtype=np.int64),
+        "close_time": np.array([kline["T"]], dtype=np.int64),
+    }
+    for col, field in [("open", "o"), ("high", "h"), ("low", "l"), ("close", "c"), ("volume", "v")]:
+        candles[col] = np.array([float(kline[field])])
+    return kline["s"], kline["i"], candles
+
+
+class BinanceKlineFeed:
+    """Closed klines from one Binance combined-stream websocket.
+
+    Streams are (re)subscribed on every connection, so ``subscribe`` may be called
+    at any time; dropped connections are retried with exponential backoff.
+    """
+
+    def __init__(self, url: str | None = None) -> None:
+        if websockets is None:
+            raise RuntimeError("the Binance kline feed requires the 'websockets' package")
+        self.url = settings.binance_ws_url if url is None else url
+        self.streams: set[str] = set()
+        self.reconnects = 0
+        self._ws = None
+        self._request_id = 0
+        self._wanted = asyncio.Event()
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    def subscribe(self, symbol: str, timeframe: str) -> None:
+        stream = f"{symbol.lower()}@kline_{BinanceConnector.interval(timeframe)}"
+        if stream in self.streams:
+            return
+        self.streams.add(stream)
+        self._wanted.set()
+        if self._ws is not None:
+            asyncio.ensure_future(self._send_subscribe(self._ws, [stream]))
+
+    async def _send_subscribe(self, ws, streams: list[str]) -> None:
+        self._request_id += 1
+        try:
+            await ws.send(json.dumps({"method": "SUBSCRIBE", "params": streams, "id": self._request_id}))
+        except websockets.WebSocketException:
+            pass  # connection dropped; the next one subscribes to everything
+
+    async def events(self) -> AsyncIterator[tuple[str, str, Candles]]:
+        backoff = 1.0
+        while True:
+            await self._wanted.wait()
+            try:
+                async with websockets.connect(f"{self.url}/stream", ping_interval=20) as ws:
+                    self._ws = ws
+                    await self._send_subscribe(ws, sorted(self.streams))
+                    backoff = 1.0
+                    async for raw in ws:
+                        parsed = _parse_kline_message(raw)
+                        if parsed is not None:
+                            yield parsed
+            except (OSError, websockets.WebSocketException) as exc:
+                logger.warning("kline feed disconnected: %s; reconnecting in %.0fs", exc, backoff)
+            finally:
+                self._ws = None
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+
+class ReplayFeed:
+    """Replays recorded candles as if they were closing live.
+
+    The first ``warm_bars`` rows of each series are history (served through
+    ``fetch_history``/``fetch_since``); the rest are emitted in ``close_time``
+    order, ``delay_s`` apart. The feed's clock is the replay position, so
+    freshness checks work on old recordings.
+    """
+
+    def __init__(self, candles: Mapping[Key, Mapping[str, np.ndarray]], warm_bars: int, delay_s: float = 0.0) -> None:
+        self.candles = {key: {col: np.asarray(values) for col, values in series.items()} for key, series in candles.items() if len(series["open_time"])}
+        self.delay_s = delay_s
+        self.reconnects = 0
+        self.streams: set[Key] = set()
+        self._cursor = {key: min(warm_bars, len(series["open_time"])) for key, series in self.candles.items()}
+        self._clock = max((int(s["close_time"][self._cursor[k] - 1]) for k, s in self.candles.items() if self._cursor[k]), default=0)
+
+    def now_ms(self) -> int:
+        return self._clock + 1
+
+    def subscribe(self, symbol: str, timeframe: str) -> None:
+        self.streams.add((symbol, timeframe))
+
+    async def fetch_history(self, symbol: str, timeframe: str, limit: int, end_time: int | None = None) -> Candles:
+        series, stop = self.candles.get((symbol, timeframe)), self._cursor.get((symbol, timeframe), 0)
+        if series is None:
+            raise KeyError(f"no recorded candles for {symbol} {timeframe}")
+        return {col: values[max(stop - limit, 0) : stop].copy() for col, values in series.items()}
+
+    async def fetch_since(self, symbol: str, timeframe: str, start_time: int) -> Candles:
+        series, stop = self.candles[(symbol, timeframe)], self._cursor[(symbol, timeframe)]
+        start = int(np.searchsorted(series["open_time"][:stop], start_time))
+        return {col: values[start:stop].copy() for col, values in series.items()}
+
+    async def events(self) -> AsyncIterator[tuple[str, str, Candles]]:
+        keys = list(self.candles)
+        order = sorted(
+            (int(series["close_time"][i]), k, i)
+            for k, key in enumerate(keys)
+            for series in [self.candles[key]]
+            for i in range(self._cursor[key], len(series["open_time"]))
+        )
+        for close_time, k, i in order:
+            key = keys[k]
+            self._cursor[key] = i + 1
+            self._clock = max(self._clock, close_time)
+            if key in self.streams:
+                yield key[0], key[1], {col: values[i : i + 1] for col, values in self.candles[key].items()}
+            if self.delay_s:
+                await asyncio.sleep(self.delay_s)
+
+
+def replay_from_store(store: CandleStore, keys: Iterable[Key], warm_bars: int, delay_s: float) -> ReplayFeed:
+    candles = {}
+    for symbol, timeframe in keys:
+        stored = store.read("binance", symbol, BinanceConnector.interval(timeframe))
+        candles[(symbol, timeframe)] = {col: np.array(values) for col, values in stored.items()}
+    return ReplayFeed(candles, warm_bars, delay_s)
+
+
+class IngestionService:
+    """In-memory live histories for tracked (symbol, timeframe) series.
+
+    Buffers hold ``2 * history_bars`` candles so a served window stays valid for at
+    least ``history_bars`` further candles. Missed candles (e.g. across a feed
+    reconnect) are fetched over REST from ``history`` before new ones are appended.
+    If the feed raises, the failure is logged and recorded in ``feed_error`` (shown
+    by ``/api/health``) and the feed is restarted with exponential backoff.
+    ``history_bars`` and ``max_streams`` default to the ``Settings`` values.
+    """
+
+    def __init__(self, feed: CandleFeed, history, history_bars: int | None = None, max_streams: int | None = None) -> None:
+        self.feed = feed
+        self.history = history
+        self.history_bars = settings.ingestion_history_bars if history_bars is None else history_bars
+        self.max_streams = settings.ingestion_max_streams if max_streams is None else max_streams
+        self.buffers: dict[Key, RingBuffer] = {}
+        self._ready: set[Key] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._runner: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.candles = 0
+        self.feed_failures = 0
+        self.feed_error: str | None = None
+
+    def start(self, keys: Iterable[Key] = ()) -> None:
+        for symbol, timeframe in keys:
+            self.track(symbol, timeframe)
+        self._runner = asyncio.create_task(self._run(), name="candle-ingestion")
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, *([self._runner] if self._runner else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+
+    def track(self, symbol: str, timeframe: str) -> None:
+        """Start ingesting a series in the background; a no-op if it is already tracked."""
+        key = (symbol, timeframe)
+        if key in self.buffers or len(self.buffers) >= self.max_streams or timeframe not in INTERVAL_MS:
+            return
+        self.buffers[key] = RingBuffer(2 * self.history_bars)
+        task = asyncio.ensure_future(self._backfill(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _backfill(self, key: Key) -> None:
+        symbol, timeframe = key
+        self.feed.subscribe(symbol, timeframe)
+        try:
+            history = await self.history.fetch_history(symbol, timeframe, self.history_bars + 1)
+        except Exception as exc:
+            logger.warning("backfill of %s %s failed: %s", symbol, timeframe, exc)
+            self.buffers.pop(key, None)
+            return
+        closed = history["close_time"] < self.feed.now_ms()
+        self.buffers[key].extend({col: values[closed] for col, values in history.items()})
+        self._ready.add(key)
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await self._consume()
+                return  # a finite feed (e.g. a replay) has run out
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.feed_failures += 1
+                self.feed_error = f"{type(exc).__name__}: {exc}"
+                logger.exception("candle feed failed; restarting in %.0fs", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    async def _consume(self) -> None:
+        async for symbol, timeframe, candles in self.feed.events():
+            self.feed_error = None
+            key = (symbol, timeframe)
+            buffer = self.buffers.get(key)
+            if buffer is None or key not in self._ready:
+                continue
+            last = buffer.last_open_time
+            if last is not None and int(candles["open_time"][0]) > last + INTERVAL_MS[timeframe]:
+                try:
+                    missed = await self.history.fetch_since(symbol, timeframe, last + 1)
+                    closed = missed["close_time"] < self.feed.now_ms()
+                    buffer.extend({col: values[closed] for col, values in missed.items()})
+                except Exception as exc:
+                    logger.warning("gap fill for %s %s failed: %s", symbol, timeframe, exc)
+            self.candles += buffer.extend(candles)
+
+    def _current(self, buffer: RingBuffer, timeframe: str) -> bool:
+        last_close = buffer.last_close_time
+        return last_close is not None and self.feed.now_ms() <= last_close + INTERVAL_MS[timeframe] + FRESHNESS_GRACE_MS
+
+    def read(self, symbol: str, timeframe: str, limit: int) -> OHLCV | None:
+        """The latest ``limit`` closed candles as zero-copy views, or None if the buffer can't serve them."""
+        key = (symbol, timeframe)
+        buffer = self.buffers.get(key)
+        if key not in self._ready or limit > self.history_bars or buffer.size < limit or not self._current(buffer, timeframe):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return OHLCV.from_candles(buffer.latest(limit))
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "candles": self.candles,
+            "reconnects": self.feed.reconnects,
+            "feed_failures": self.feed_failures,
+            "streams": len(self._ready),
+        }
+
+    def health(self) -> dict:
+        running = self._runner is not None and not self._runner.done()
+        return {"running": running, "streams": len(self._ready), "feed_failures": self.feed_failures, "feed_error": self.feed_error}
+
+
+class LiveConnector(BaseConnector):
+    """Reads from the ingestion buffers when they are warm and current, otherwise from ``fallback``.
+
+    With ``auto_track`` a missed series starts being ingested, so repeat requests
+    for the same symbol are served from memory. ``auto_track`` defaults to
+    ``Settings.ingestion_auto_track``.
+    """
+
+    def __init__(self, service: IngestionService, fallback: BaseConnector, auto_track: bool | None = None) -> None:
+        super().__init__(name=fallback.name)
+        self.service = service
+        self.fallback = fallback
+        self.auto_track = settings.ingestion_auto_track if auto_track is None else auto_track
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int = 500) -> OHLCV:
+        candles = self.service.read(symbol, timeframe, limit)
+        if candles is not None:
+            return candles
+        if self.auto_track:
+            self.service.track(symbol, timeframe)
+        return await self.fallback.fetch_ohlcv(symbol, timeframe, limit)
+
+
+ingestion_service: IngestionService | None = None
+
+
+def start_ingestion(store: CandleStore) -> IngestionService:
+    global ingestion_service
+    keys = [(symbol, timeframe) for symbol in settings.ingestion_symbols for timeframe in settings.ingestion_timeframes]
+    history_bars, max_streams = settings.ingestion_history_bars, settings.ingestion_max_streams
+    if settings.ingestion_feed == "replay":
+        feed = replay_from_store(store, keys, history_bars, settings.ingestion_replay_delay_s)
+        service = IngestionService(feed, feed, history_bars, max_streams)
+    else:
+        service = IngestionService(BinanceKlineFeed(), BinanceConnector(), history_bars, max_streams)
+    service.start(keys)
+    ingestion_service = service
+    return service
+
+
+async def stop_ingestion() -> None:
+    global ingestion_service
+    if ingestion_service is not None:
+        await ingestion_service.stop()
+        ingestion_service = None
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def _column(values, dtype) -> np.ndarray:
+    # A view, so marking it read-only never changes the flags of the caller's array.
+    arr = np.ascontiguousarray(values, dtype=dtype).view()
+    arr.flags.writeable = False
+    return arr
+
+
+class OHLCV:
+    """Candles as contiguous, read-only column arrays.
+
+    ``timestamp`` is the bar open time in epoch milliseconds (int64); prices and
+    volume are float64. ``ohlcv["close"]`` returns the array itself and
+    ``ohlcv[a:b]`` a view of a row range, so indicators, the backtester and the
+    regime detector read it without building a DataFrame. ``to_frame`` gives the
+    connector DataFrame shape, sharing the price columns.
+    """
+
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume", "__weakref__")
+
+    def __init__(self, timestamp, open, high, low, close, volume) -> None:
+        self.timestamp = _column(timestamp, np.int64)
+        self.open = _column(open, np.float64)
+        self.high = _column(high, np.float64)
+        self.low = _column(low, np.float64)
+        self.close = _column(close, np.float64)
+        self.volume = _column(volume, np.float64)
+
+    @classmethod
+    def from_candles(cls, candles: Mapping[str, np.ndarray]) -> OHLCV:
+        """From ``CandleStore``/kline columns, keyed by ``open_time`` rather than ``timestamp``."""
+        return cls(candles["open_time"], candles["open"], candles["high"], candles["low"], candles["close"], candles["volume"])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> OHLCV:
+        return cls(timestamps_ms(df), df["open"], df["high"], df["low"], df["close"], df["volume"])
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __contains__(self, column: str) -> bool:
+        return column in OHLCV_COLUMNS
+
+    def __getitem__(self, key: str | slice):
+        if isinstance(key, slice):
+            return OHLCV(*(getattr(self, col)[key] for col in OHLCV_COLUMNS))
+        if key not in OHLCV_COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __reduce__(self):
+        return OHLCV, tuple(getattr(self, col) for col in OHLCV_COLUMNS)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def index(self) -> pd.RangeIndex:
+        return pd.RangeIndex(len(self))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, col).nbytes for col in OHLCV_COLUMNS)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"timestamp": pd.to_datetime(self.timestamp, unit="ms", utc=True), **{col: getattr(self, col) for col in OHLCV_COLUMNS[1:]}},
+            copy=False,
+        )
+
+
+def timestamps_ms(data: OHLCV | pd.DataFrame) -> np.ndarray:
+    """Bar open times in epoch milliseconds, for either candle representation."""
+    stamps = data["timestamp"]
+    if isinstance(stamps, np.ndarray) and stamps.dtype == np.int64:
+        return stamps
+    return pd.DatetimeIndex(stamps).as_unit("ms").asi8
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+
+from app.data.ohlcv import OHLCV, timestamps_ms
+
+PANEL_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class Panel:
+    """Aligned OHLCV for many assets.
+
+    ``panel["close"]`` is a (bars x assets) frame with one column per asset, so the
+    indicator functions and ``generate_signals`` logic run on every asset at once.
+    Rows are the timestamps (epoch ms) shared by all assets. Treat panels as immutable.
+    """
+
+    def __init__(self, timestamps: np.ndarray, assets: list[str], fields: Mapping[str, np.ndarray]) -> None:
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.assets = list(assets)
+        self.index = pd.RangeIndex(len(self.timestamps))
+        self._fields = {name: pd.DataFrame(values, index=self.index, columns=self.assets, copy=False) for name, values in fields.items()}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._fields or field == "timestamp"
+
+    def __getitem__(self, field: str) -> pd.DataFrame | np.ndarray:
+        if field == "timestamp":
+            return self.timestamps
+        return self._fields[field]
+
+    def frame(self, asset: str) -> OHLCV:
+        """One asset's aligned rows."""
+        return OHLCV(self.timestamps, *(self._fields[name][asset] for name in PANEL_FIELDS))
+
+
+def build_panel(frames: Mapping[str, OHLCV | pd.DataFrame]) -> Panel:
+    """Align candles on the timestamps present in every one of them."""
+    assets = list(frames)
+    common: pd.Index | None = None
+    for df in frames.values():
+        stamps = pd.Index(timestamps_ms(df))
+        common = stamps if common is None else common.intersection(stamps)
+    common = (common if common is not None else pd.Index([], dtype=np.int64)).sort_values()
+
+    fields = {name: np.empty((len(common), len(assets))) for name in PANEL_FIELDS}
+    for j, df in enumerate(frames.values()):
+        rows = pd.Index(timestamps_ms(df)).get_indexer(common)
+        for name in PANEL_FIELDS:
+            fields[name][:, j] = np.asarray(df[name], dtype=float)[rows]
+    return Panel(common.to_numpy(), assets, fields)
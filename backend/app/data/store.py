@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+STORE_DIR = Path(__file__).resolve().parents[1] / "candle_store"
+# Marker file in a series directory: the exchange has no candles older than the first stored one.
+COMPLETE_MARKER = ".complete"
+
+CANDLE_COLUMNS: dict[str, np.dtype] = {
+    "open_time": np.dtype("<i8"),
+    "close_time": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+
+def empty_candles() -> dict[str, np.ndarray]:
+    return {col: np.empty(0, dtype=dtype) for col, dtype in CANDLE_COLUMNS.items()}
+
+
+class CandleStore:
+    """On-disk columnar candle store: one raw little-endian file per column per (exchange, symbol, timeframe).
+
+    Reads are read-only memory maps, so slicing the tail of a long history costs no
+    copy. New candles are appended to the column files; backfills of older candles
+    rewrite them atomically. Only closed candles should be written. A series whose
+    full history is stored is marked complete, so it is never backfilled again.
+    """
+
+    def __init__(self, root: Path = STORE_DIR) -> None:
+        self.root = Path(root)
+        self._locks: dict[tuple[str, str, str], asyncio.Lock] = {}
+
+    def lock(self, exchange: str, symbol: str, timeframe: str) -> asyncio.Lock:
+        return self._locks.setdefault((exchange, symbol, timeframe), asyncio.Lock())
+
+    def _dir(self, exchange: str, symbol: str, timeframe: str) -> Path:
+        return self.root / exchange / f"{symbol.upper()}_{timeframe}"
+
+    def is_complete(self, exchange: str, symbol: str, timeframe: str) -> bool:
+        return (self._dir(exchange, symbol, timeframe) / COMPLETE_MARKER).exists()
+
+    def mark_complete(self, exchange: str, symbol: str, timeframe: str) -> None:
+        path = self._dir(exchange, symbol, timeframe)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / COMPLETE_MARKER).touch()
+
+    def read(self, exchange: str, symbol: str, timeframe: str) -> dict[str, np.ndarray]:
+        path = self._dir(exchange, symbol, timeframe)
+        sizes = {}
+        for col, dtype in CANDLE_COLUMNS.items():
+            file = path / col
+            sizes[col] = file.stat().st_size // dtype.itemsize if file.exists() else 0
+        # Columns are appended one after another; an interrupted append leaves some longer.
+        n = min(sizes.values())
+        if n == 0:
+            return empty_candles()
+        return {col: np.memmap(path / col, dtype=dtype, mode="r", shape=(n,)) for col, dtype in CANDLE_COLUMNS.items()}
+
+    def append(self, exchange: str, symbol: str, timeframe: str, candles: dict[str, np.ndarray]) -> int:
+        """Append candles newer than the last stored one; returns the number written."""
+        current = self.read(exchange, symbol, timeframe)
+        new = candles
+        if len(current["open_time"]):
+            keep = candles["open_time"] > current["open_time"][-1]
+            new = {col: values[keep] for col, values in candles.items()}
+        n = len(new["open_time"])
+        if n == 0:
+            return 0
+        path = self._dir(exchange, symbol, timeframe)
+        path.mkdir(parents=True, exist_ok=True)
+        length = len(current["open_time"])
+        for col, dtype in CANDLE_COLUMNS.items():
+            with open(path / col, "r+b" if (path / col).exists() else "wb") as fh:
+                fh.truncate(length * dtype.itemsize)
+                fh.seek(length * dtype.itemsize)
+                fh.write(np.ascontiguousarray(new[col], dtype=dtype).tobytes())
+        return n
+
+    def prepend(self, exchange: str, symbol: str, timeframe: str, candles: dict[str, np.ndarray]) -> int:
+        """Backfill candles older than the first stored one; returns the number written."""
+        current = self.read(exchange, symbol, timeframe)
+        old = candles
+        if len(current["open_time"]):
+            keep = candles["open_time"] < current["open_time"][0]
+            old = {col: values[keep] for col, values in candles.items()}
+        n = len(old["open_time"])
+        if n == 0:
+            return 0
+        # Rewrite into a sibling directory and swap it in so columns never mix generations.
+        path = self._dir(exchange, symbol, timeframe)
+        staging = path.with_name(path.name + ".staging")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for col, dtype in CANDLE_COLUMNS.items():
+            with open(staging / col, "wb") as fh:
+                fh.write(np.ascontiguousarray(old[col], dtype=dtype).tobytes())
+                fh.write(np.ascontiguousarray(current[col], dtype=dtype).tobytes())
+        if (path / COMPLETE_MARKER).exists():
+            (staging / COMPLETE_MARKER).touch()
+        retired = path.with_name(path.name + ".retired")
+        if path.exists():
+            path.rename(retired)
+        staging.rename(path)
+        shutil.rmtree(retired, ignore_errors=True)
+        return n
@@ -1,15 +1,77 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router
 from app.core.config import settings
+from app.core.metrics import request_timings, server_timing_header
+from app.core.profiling import SamplingProfiler, active_profiler, report_slow_request
+from app.core.warmup import warm_up
+from app.data.connectors import candle_store
+from app.data.http import close_sessions
+from app.data.ingestion import start_ingestion, stop_ingestion
+from app.research.pipeline import research_executor
+from app.research.scheduler import start_scheduler, stop_scheduler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.ingestion_enabled:
+        start_ingestion(candle_store)
+    warmup = asyncio.create_task(warm_up()) if settings.warmup_enabled else None
+    if settings.scheduler_enabled:
+        start_scheduler()
+    yield
+    await stop_scheduler()
+    if warmup is not None:
+        warmup.cancel()
+    await stop_ingestion()
+    research_executor.shutdown()
+    await close_sessions()
 
-app = FastAPI(title=settings.app_name)
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+
+
+@app.middleware("http")
+async def request_instrumentation(request: Request, call_next):
+    """Opt-in per-request ``Server-Timing`` (``X-Server-Timing: 1``) and sampling profile (``X-Profile: 1``)."""
+    want_timing = settings.server_timing_enabled or request.headers.get("x-server-timing") == "1"
+    profiler = SamplingProfiler() if settings.profiling_enabled and request.headers.get("x-profile") == "1" else None
+    if not want_timing and profiler is None:
+        return await call_next(request)
+
+    token = request_timings.set({}) if want_timing else None
+    profiler_token = active_profiler.set(profiler) if profiler is not None else None
+    if profiler is not None:
+        profiler.start()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings = request_timings.get()
+        if token is not None:
+            request_timings.reset(token)
+        if profiler is not None:
+            active_profiler.reset(profiler_token)
+            samples = profiler.stop()
+            if elapsed * 1000 >= settings.slow_request_ms:
+                report_slow_request(request.method, request.url.path, elapsed, samples)
+    if want_timing:
+        response.headers["Server-Timing"] = server_timing_header({**timings, "total": [elapsed]})
+    return response
+
+
 app.include_router(router)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, TypeVar
+
+from app.core.config import settings
+from app.data.ohlcv import OHLCV, timestamps_ms
+from app.strategies.generator import base_strategies
+from app.strategies.indicators import dataset_fingerprint
+
+T = TypeVar("T")
+
+INTERVAL_S = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400, "1w": 604800}
+# Exchange weeks open on Monday 00:00 UTC; the Unix epoch fell on a Thursday.
+WEEK_OFFSET_S = 4 * 86400
+
+
+def next_bar_close(timeframe: str, now: float | None = None) -> float:
+    """Unix time of the next bar boundary for ``timeframe``."""
+    now = time.time() if now is None else now
+    interval = INTERVAL_S.get(timeframe, 3600)
+    offset = WEEK_OFFSET_S if timeframe == "1w" else 0
+    return ((now - offset) // interval + 1) * interval + offset
+
+
+def strategy_fingerprint() -> tuple:
+    return tuple((spec.name, spec.version, tuple(sorted(spec.params.items()))) for spec in base_strategies())
+
+
+def recommendation_key(market: str, asset: str, timeframe: str, df: OHLCV, *options) -> tuple:
+    """Everything a cached recommendation depends on: the input bars, strategy specs, cost/tuning settings and request ``options``."""
+    last_bar = int(timestamps_ms(df)[-1]) if "timestamp" in df and len(df) else len(df)
+    return (
+        market,
+        asset,
+        timeframe,
+        last_bar,
+        dataset_fingerprint(df),
+        strategy_fingerprint(),
+        settings.transaction_cost_bps,
+        settings.slippage_bps,
+        (settings.optuna_trials, settings.optuna_prune, settings.optuna_batch_size),
+        *options,
+    )
+
+
+class RecommendationCache:
+    """LRU cache of computed results that expire at a given wall-clock time.
+
+    Concurrent requests for the same key share one computation (single-flight);
+    the computation is cancelled only once every waiter has gone away.
+    """
+
+    def __init__(self, max_entries: int = settings.recommendation_cache_entries) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._inflight: dict[tuple, tuple[asyncio.Task, list[int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def get(self, key: tuple) -> object | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: object, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: tuple, expires_at: float, compute: Callable[[], Awaitable[T]]) -> T:
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            inflight = self._inflight[key] = (task, [0])
+
+            def finished(done: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self.put(key, done.result(), expires_at)
+
+            task.add_done_callback(finished)
+        else:
+            self.shared += 1
+
+        task, waiters = inflight
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if waiters[0] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "shared": self.shared}
+
+
+recommendation_cache = RecommendationCache()
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+from typing import Mapping
+
+import numpy as np
 import pandas as pd
 
-from app.backtesting.engine import backtest
+from app.backtesting.engine import backtest_batch
 from app.core.config import settings
+from app.core.metrics import timed
+from app.data.ohlcv import OHLCV
+from app.data.panel import Panel
 from app.schemas.models import StrategyPerformance
-from app.strategies.generator import StrategySpec, generate_signals
+from app.strategies.generator import SIGNAL_DTYPE, StrategyEvaluator, StrategySpec, generate_panel_signals
 
 
 REGIME_STYLE_MAP = {
@@ -17,42 +23,118 @@ REGIME_STYLE_MAP = {
 }
 
 
-def _confidence(metrics: dict, regime: str, strategy: StrategySpec) -> float:
-    score = 50.0
-    score += min(metrics["sharpe"] * 10, 20)
-    score += min(metrics["profit_factor"] * 3, 15)
-    score -= abs(metrics["max_drawdown"]) * 100
-    if strategy.style == REGIME_STYLE_MAP.get(regime, ["swing"])[0]:
-        score += 10
-    return float(max(0, min(100, score)))
+def _confidence(metrics: dict, regimes: list[str], strategies: list[StrategySpec]) -> np.ndarray:
+    """(strategies x assets) confidence scores from (strategies x assets) metric arrays."""
+    score = 50.0 + np.minimum(metrics["sharpe"] * 10, 20)
+    score += np.minimum(metrics["profit_factor"] * 3, 15)
+    score -= np.abs(metrics["max_drawdown"]) * 100
+    preferred = np.array([REGIME_STYLE_MAP.get(regime, ["swing"])[0] for regime in regimes])
+    styles = np.array([spec.style for spec in strategies])
+    score += np.where(styles[:, None] == preferred[None, :], 10.0, 0.0)
+    return np.clip(score, 0, 100)
+
+
+def _top_strategies(
+    metrics: dict,
+    regimes: list[str],
+    strategies: list[StrategySpec],
+    out_of_sample: dict[str, dict] | None = None,
+    top_n: int = 3,
+) -> list[list[StrategyPerformance]]:
+    """Rank strategies per asset by (confidence, sharpe, cagr) and keep the best ``top_n``.
+
+    ``metrics`` holds (strategies x assets) arrays; ranking is a single lexsort over
+    the strategy axis, so only the selected rows are turned into models.
+    """
+    confidence = _confidence(metrics, regimes, strategies)
+    order = np.lexsort((-metrics["cagr"], -metrics["sharpe"], -confidence), axis=0)[:top_n]
+    out: list[list[StrategyPerformance]] = []
+    for j, regime in enumerate(regimes):
+        rows = []
+        for i in order[:, j]:
+            spec = strategies[i]
+            oos = (out_of_sample or {}).get(spec.name) or {}
+            rows.append(
+                StrategyPerformance(
+                    name=spec.name,
+                    expected_annualized_return=metrics["cagr"][i, j],
+                    max_drawdown=metrics["max_drawdown"][i, j],
+                    sharpe_ratio=metrics["sharpe"][i, j],
+                    sortino_ratio=metrics["sortino"][i, j],
+                    win_rate=metrics["win_rate"][i, j],
+                    profit_factor=metrics["profit_factor"][i, j],
+                    suggested_direction=metrics["direction"][i, j],
+                    confidence_score=float(confidence[i, j]),
+                    favorable_conditions=f"Best in {spec.style} setups during {regime.replace('_', ' ')}",
+                    oos_annualized_return=oos.get("cagr"),
+                    oos_max_drawdown=oos.get("max_drawdown"),
+                    oos_sharpe_ratio=oos.get("sharpe"),
+                    oos_sortino_ratio=oos.get("sortino"),
+                    oos_win_rate=oos.get("win_rate"),
+                    oos_profit_factor=oos.get("profit_factor"),
+                    oos_folds=oos.get("folds"),
+                )
+            )
+        out.append(rows)
+    return out
+
+
+@timed("recommend")
+def recommend(
+    df: OHLCV | pd.DataFrame,
+    timeframe: str,
+    regime: str,
+    strategies: list[StrategySpec],
+    out_of_sample: dict[str, dict] | None = None,
+    evaluators: Mapping[str, StrategyEvaluator] | None = None,
+) -> list[StrategyPerformance]:
+    """Backtest ``strategies`` on ``df`` and rank them.
+
+    ``evaluators`` (by strategy name, e.g. the ones used for tuning) are reused to
+    write each strategy's signals straight into the signal matrix.
+    """
+    if not strategies:
+        return []
+    signals = np.empty((len(df), len(strategies)), dtype=SIGNAL_DTYPE)
+    for i, spec in enumerate(strategies):
+        evaluator = (evaluators or {}).get(spec.name)
+        if evaluator is None:
+            evaluator = StrategyEvaluator(df, spec)
+        evaluator.signals(spec.params, out=signals[:, i])
+    batch = backtest_batch(
+        np.asarray(df["close"], dtype=float),
+        signals,
+        timeframe=timeframe,
+        transaction_cost_bps=settings.transaction_cost_bps,
+        slippage_bps=settings.slippage_bps,
+        position_size=1.0,
+    )
+    metrics = {key: values[:, None] for key, values in batch.items()}
+    return _top_strategies(metrics, [regime], strategies, out_of_sample)[0]
+
 
+@timed("recommend_panel")
+def recommend_panel(panel: Panel, timeframe: str, regimes: Mapping[str, str], strategies: list[StrategySpec]) -> dict[str, list[StrategyPerformance]]:
+    """Top strategies for every asset of a panel.
 
-def recommend(df: pd.DataFrame, timeframe: str, regime: str, strategies: list[StrategySpec]) -> list[StrategyPerformance]:
-    rows: list[StrategyPerformance] = []
-    for spec in strategies:
-        signal = generate_signals(df, spec)
-        metrics = backtest(
-            df,
-            signal,
+    Each strategy's signals and backtest run across all assets as (bars x assets)
+    arrays, so the work is one vectorized pass per strategy rather than one
+    pipeline per (asset, strategy) pair.
+    """
+    if not strategies or not panel.assets:
+        return {asset: [] for asset in panel.assets}
+    close = panel["close"].to_numpy(dtype=float)
+    batches = [
+        backtest_batch(
+            close,
+            generate_panel_signals(panel, spec),
             timeframe=timeframe,
             transaction_cost_bps=settings.transaction_cost_bps,
             slippage_bps=settings.slippage_bps,
             position_size=1.0,
         )
-        rows.append(
-            StrategyPerformance(
-                name=spec.name,
-                expected_annualized_return=metrics["cagr"],
-                max_drawdown=metrics["max_drawdown"],
-                sharpe_ratio=metrics["sharpe"],
-                sortino_ratio=metrics["sortino"],
-                win_rate=metrics["win_rate"],
-                profit_factor=metrics["profit_factor"],
-                suggested_direction=metrics["direction"],
-                confidence_score=_confidence(metrics, regime, spec),
-                favorable_conditions=f"Best in {spec.style} setups during {regime.replace('_', ' ')}",
-            )
-        )
-
-    ranked = sorted(rows, key=lambda x: (x.confidence_score, x.sharpe_ratio, x.expected_annualized_return), reverse=True)
-    return ranked[:3]
+        for spec in strategies
+    ]
+    metrics = {key: np.stack([batch[key] for batch in batches]) for key in batches[0]}
+    tops = _top_strategies(metrics, [regimes[asset] for asset in panel.assets], strategies)
+    return dict(zip(panel.assets, tops, strict=True))
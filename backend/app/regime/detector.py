@@ -1,38 +1,168 @@
 from __future__ import annotations
 
+import threading
+import time
+from dataclasses import dataclass
+from typing import Mapping
+
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
 
+from app.backtesting.engine import price_returns
+from app.core import kernels
+from app.core.config import settings
+from app.core.metrics import timed
+from app.data.ohlcv import OHLCV, timestamps_ms
+
+
+def _adx(df: OHLCV | pd.DataFrame, n: int = 14) -> np.ndarray:
+    high, low, close = (kernels.as_float_array(df[col]) for col in ("high", "low", "close"))
+    plus_dm = np.maximum(kernels.diff(high), 0)
+    minus_dm = kernels.diff(low)
+    np.negative(minus_dm, out=minus_dm)
+    np.maximum(minus_dm, 0, out=minus_dm)
+    atr = kernels.rolling_mean(kernels.true_range(high, low, close), n)
+    atr[atr == 0] = np.nan
+    plus_di = kernels.rolling_mean(plus_dm, n)
+    plus_di *= 100
+    plus_di /= atr
+    minus_di = kernels.rolling_mean(minus_dm, n)
+    minus_di *= 100
+    minus_di /= atr
+    total = plus_di + minus_di
+    total[total == 0] = np.nan
+    dx = np.abs(plus_di - minus_di)
+    dx *= 100
+    dx /= total
+    np.nan_to_num(dx, copy=False, nan=0.0)
+    adx = kernels.rolling_mean(dx, n)
+    return np.nan_to_num(adx, copy=False, nan=0.0)
+
+
+def regime_features(df: OHLCV | pd.DataFrame) -> np.ndarray:
+    """(bars x 2) rolling return volatility and ADX; rows with missing values are dropped."""
+    ret = np.nan_to_num(price_returns(df["close"]), copy=False, nan=0.0)
+    rolling_vol = kernels.rolling_std(ret, 24)
+    rolling_vol[np.isnan(rolling_vol)] = ret.std(ddof=1) if len(ret) > 1 else np.nan
+    features = np.column_stack([rolling_vol, _adx(df)])
+    return features[~np.isnan(features).any(axis=1)]
+
+
+def _label(centers: np.ndarray, cluster: int) -> str:
+    vol_level, trend_level = centers[cluster]
+    high_vol = vol_level >= np.quantile(centers[:, 0], 0.6)
+    if trend_level >= np.quantile(centers[:, 1], 0.6):
+        return "trending_high_vol" if high_vol else "trending_low_vol"
+    return "ranging_high_vol" if high_vol else "ranging_low_vol"
 
-def _adx(df: pd.DataFrame, n: int = 14) -> pd.Series:
-    high, low, close = df["high"], df["low"], df["close"]
-    plus_dm = (high.diff()).clip(lower=0)
-    minus_dm = (-low.diff()).clip(lower=0)
-    tr = pd.concat([(high - low), (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
-    atr = tr.rolling(n).mean()
-    plus_di = 100 * (plus_dm.rolling(n).mean() / atr.replace(0, np.nan))
-    minus_di = 100 * (minus_dm.rolling(n).mean() / atr.replace(0, np.nan))
-    dx = (100 * (plus_di - minus_di).abs() / (plus_di + minus_di).replace(0, np.nan)).fillna(0)
-    return dx.rolling(n).mean().fillna(0)
 
+def _kmeans(**kwargs):
+    # scikit-learn takes over a second to import, so it loads on the first fit rather than with the API.
+    from sklearn.cluster import KMeans
 
-def detect_regime(df: pd.DataFrame) -> str:
-    close = df["close"].astype(float)
-    ret = close.pct_change().fillna(0)
-    rolling_vol = ret.rolling(24).std().fillna(ret.std())
-    adx = _adx(df).fillna(0)
+    return KMeans(n_clusters=4, random_state=42, **kwargs)
 
-    features = pd.DataFrame({"vol": rolling_vol, "trend": adx}).dropna()
+
+def _fit_centers(features: np.ndarray, init: np.ndarray | None = None) -> np.ndarray:
+    if init is None:
+        model = _kmeans(n_init="auto")
+    else:
+        model = _kmeans(init=init, n_init=1)
+    model.fit(features)
+    return model.cluster_centers_
+
+
+def _nearest(centers: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Index of the nearest center per point; ``centers`` is (k, 2) or (n, k, 2) for per-point centers."""
+    if centers.ndim == 2:
+        centers = centers[None]
+    return np.argmin(((centers - points[:, None, :]) ** 2).sum(axis=-1), axis=1)
+
+
+@timed("detect_regime")
+def detect_regime(df: OHLCV | pd.DataFrame) -> str:
+    features = regime_features(df)
     if len(features) < 20:
         return "unknown"
 
-    model = KMeans(n_clusters=4, random_state=42, n_init="auto")
+    model = _kmeans(n_init="auto")
     labels = model.fit_predict(features)
-    latest_cluster = labels[-1]
-    center = model.cluster_centers_[latest_cluster]
-    vol_level, trend_level = center[0], center[1]
+    return _label(model.cluster_centers_, labels[-1])
+
+
+@dataclass
+class RegimeModel:
+    centers: np.ndarray
+    fitted_at: float
+    last_bar: int
+    bars_since_fit: int = 0
+
+
+class RegimeService:
+    """Cached regime classifier per (market, asset, timeframe).
+
+    Cluster centers are fitted once and reused: new bars are labelled by their
+    nearest center until the model is older than ``max_age_s`` or has seen
+    ``refit_bars`` new bars, at which point it is refitted warm-started from the
+    previous centers.
+    """
+
+    def __init__(self, max_age_s: float = settings.regime_max_age_s, refit_bars: int = settings.regime_refit_bars) -> None:
+        self.max_age_s = max_age_s
+        self.refit_bars = refit_bars
+        self._models: dict[tuple, RegimeModel] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _last_bar(df: OHLCV | pd.DataFrame) -> int:
+        return int(timestamps_ms(df)[-1]) if "timestamp" in df else len(df)
+
+    def _new_bars(self, model: RegimeModel, df: OHLCV | pd.DataFrame) -> int:
+        if "timestamp" in df:
+            return int((timestamps_ms(df) > model.last_bar).sum())
+        return max(len(df) - model.last_bar, 0)
+
+    def _model(self, key: tuple, df: OHLCV | pd.DataFrame, features: np.ndarray) -> RegimeModel:
+        with self._lock:
+            model = self._models.get(key)
+        now = time.monotonic()
+        if model is not None:
+            new_bars = model.bars_since_fit + self._new_bars(model, df)
+            if now - model.fitted_at < self.max_age_s and new_bars < self.refit_bars:
+                model.bars_since_fit = new_bars
+                model.last_bar = self._last_bar(df)
+                return model
+        centers = _fit_centers(features, init=model.centers if model is not None else None)
+        model = RegimeModel(centers=centers, fitted_at=now, last_bar=self._last_bar(df))
+        with self._lock:
+            self._models[key] = model
+        return model
+
+    def detect(self, key: tuple, df: OHLCV | pd.DataFrame) -> str:
+        return self.detect_many({key: df})[key]
+
+    @timed("detect_regime")
+    def detect_many(self, frames: Mapping[tuple, OHLCV | pd.DataFrame]) -> dict[tuple, str]:
+        """Label the latest bar of many series, classifying all of them in one vectorized pass."""
+        out: dict[tuple, str] = {}
+        keys, centers, points = [], [], []
+        for key, df in frames.items():
+            features = regime_features(df)
+            if len(features) < 20:
+                out[key] = "unknown"
+                continue
+            keys.append(key)
+            centers.append(self._model(key, df, features).centers)
+            points.append(features[-1])
+        if keys:
+            stacked = np.stack(centers)
+            for key, cluster_centers, cluster in zip(keys, stacked, _nearest(stacked, np.stack(points)), strict=True):
+                out[key] = _label(cluster_centers, cluster)
+        return {key: out[key] for key in frames}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
 
-    if trend_level >= np.quantile(model.cluster_centers_[:, 1], 0.6):
-        return "trending_high_vol" if vol_level >= np.quantile(model.cluster_centers_[:, 0], 0.6) else "trending_low_vol"
-    return "ranging_high_vol" if vol_level >= np.quantile(model.cluster_centers_[:, 0], 0.6) else "ranging_low_vol"
+regime_service = RegimeService()
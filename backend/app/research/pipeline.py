@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Mapping
+
+from app.backtesting.validation import make_folds, out_of_sample_metrics
+from app.core.config import settings
+from app.core.metrics import span
+from app.core.profiling import in_request_context
+from app.data.ohlcv import OHLCV
+from app.data.panel import build_panel
+from app.recommendation.cache import next_bar_close, recommendation_cache, recommendation_key
+from app.recommendation.engine import recommend, recommend_panel
+from app.regime.detector import regime_service
+from app.schemas.models import AssetRecommendation
+from app.strategies.generator import StrategyEvaluator, StrategySpec, base_strategies, optimize_parameters
+
+_strategy_pool: ThreadPoolExecutor | None = None
+_strategy_pool_workers = 0
+_strategy_pool_lock = threading.Lock()
+
+
+def _strategy_executor(n_specs: int) -> ThreadPoolExecutor:
+    """Pool for per-strategy tuning, wide enough for every asset the research pool runs at once to fan out.
+
+    Sized from the research pool's current width; if that changes the pool is
+    replaced, and tuning already queued on the old one still runs there.
+    """
+    global _strategy_pool, _strategy_pool_workers
+    workers = research_executor.max_workers * n_specs
+    with _strategy_pool_lock:
+        if _strategy_pool is None or _strategy_pool_workers != workers:
+            if _strategy_pool is not None:
+                _strategy_pool.shutdown(wait=False)
+            _strategy_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strategy")
+            _strategy_pool_workers = workers
+        return _strategy_pool
+
+
+def _optimize_all(specs: list[StrategySpec], tune: Callable[[StrategySpec], StrategySpec], parallel: bool) -> list[StrategySpec]:
+    if not parallel:
+        return [tune(spec) for spec in specs]
+    # A dedicated pool: submitting back into the asset pool from one of its workers could deadlock.
+    return list(_strategy_executor(len(specs)).map(in_request_context(tune), specs))
+
+
+def analyze_asset(
+    asset: str,
+    market: str,
+    timeframe: str,
+    df: OHLCV,
+    parallel_strategies: bool = False,
+    evaluation: str = "in_sample",
+    n_folds: int = 5,
+) -> AssetRecommendation:
+    specs = base_strategies()
+    evaluators = {spec.name: StrategyEvaluator(df, spec) for spec in specs}
+
+    def tune(spec: StrategySpec, segments: tuple[slice, ...] | None = None) -> StrategySpec:
+        return optimize_parameters(
+            evaluators[spec.name],
+            n_trials=settings.optuna_trials,
+            n_jobs=settings.optuna_n_jobs,
+            prune=settings.optuna_prune,
+            batch_size=settings.optuna_batch_size,
+            # Fold studies tune on partial histories, so they are never persisted alongside the full-history study.
+            storage=settings.optuna_storage if segments is None else None,
+            study_key=f"{market}:{asset}:{timeframe}",
+            segments=segments,
+        )
+
+    optimized_specs = _optimize_all(specs, tune, parallel_strategies)
+    out_of_sample = None
+    folds = make_folds(evaluation, len(df), n_folds, settings.validation_purge_bars)
+    if folds:
+        with span("out_of_sample"):
+            out_of_sample = {
+                spec.name: out_of_sample_metrics(
+                    evaluators[spec.name],
+                    timeframe,
+                    folds,
+                    lambda segments, spec=spec: tune(spec, segments),
+                    settings.transaction_cost_bps,
+                    settings.slippage_bps,
+                )
+                for spec in specs
+            }
+    regime = regime_service.detect((market, asset, timeframe), df)
+    top = recommend(df, timeframe, regime, optimized_specs, out_of_sample, evaluators)
+    return AssetRecommendation(
+        asset=asset,
+        market=market,
+        timeframe=timeframe,
+        detected_regime=regime,
+        top_strategies=top,
+    )
+
+
+def scan_assets(market: str, timeframe: str, frames: Mapping[str, OHLCV]) -> list[AssetRecommendation]:
+    """Rank the default strategies for a whole universe in one panel pass (no tuning)."""
+    panel = build_panel(frames)
+    labels = regime_service.detect_many({(market, asset, timeframe): df for asset, df in frames.items()})
+    regimes = {asset: labels[(market, asset, timeframe)] for asset in frames}
+    tops = recommend_panel(panel, timeframe, regimes, base_strategies())
+    return [
+        AssetRecommendation(asset=asset, market=market, timeframe=timeframe, detected_regime=regimes[asset], top_strategies=tops[asset])
+        for asset in frames
+    ]
+
+
+class ResearchExecutor:
+    """Runs per-asset research jobs off the event loop.
+
+    ``kind`` is ``"thread"`` (NumPy/pandas kernels release the GIL), ``"process"``
+    for full core isolation, or ``"inline"`` to run on the loop for debugging.
+    ``kind`` and ``max_workers`` default to the current ``Settings.research_executor``
+    and ``Settings.research_workers`` (else the CPU count); a pool already created
+    keeps its width until ``shutdown``.
+    """
+
+    def __init__(self, kind: str | None = None, max_workers: int | None = None) -> None:
+        self._kind = kind
+        self._max_workers = max_workers
+        self._pool: Executor | None = None
+
+    @property
+    def kind(self) -> str:
+        return self._kind or settings.research_executor
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers or settings.research_workers or os.cpu_count() or 1
+
+    def _executor(self) -> Executor | None:
+        if self.kind == "inline":
+            return None
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="research")
+        return self._pool
+
+    def start(self) -> None:
+        """Create the pool now; process workers fork immediately and inherit every module and kernel loaded so far."""
+        pool = self._executor()
+        if isinstance(pool, ProcessPoolExecutor):
+            pool.submit(int).result()
+
+    async def run(self, job: Callable[[], object]):
+        """Run one job in the pool.
+
+        Cancelling the awaiting task cancels the job if it has not started; a job
+        already running finishes in the background and its result is dropped.
+        """
+        pool = self._executor()
+        if pool is None:
+            return job()
+        if self.kind == "thread":
+            # run_in_executor does not carry contextvars over; request-scoped timings and profiles need them.
+            job = in_request_context(job)
+        return await asyncio.get_running_loop().run_in_executor(pool, job)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+research_executor = ResearchExecutor()
+
+
+def asset_job(
+    asset: str, market: str, timeframe: str, df: OHLCV, evaluation: str = "in_sample", n_folds: int = 5
+) -> Callable[[], AssetRecommendation]:
+    return partial(analyze_asset, asset, market, timeframe, df, settings.research_parallel_strategies, evaluation, n_folds)
+
+
+def scan_job(market: str, timeframe: str, frames: Mapping[str, OHLCV]) -> Callable[[], list[AssetRecommendation]]:
+    return partial(scan_assets, market, timeframe, dict(frames))
+
+
+async def cached_research(
+    market: str, asset: str, timeframe: str, df: OHLCV, evaluation: str = "in_sample", n_folds: int = 5
+) -> AssetRecommendation:
+    """Cached, single-flight research for one asset; results live until the next bar closes."""
+    options = (evaluation, n_folds if evaluation != "in_sample" else None)
+    return await recommendation_cache.get_or_compute(
+        recommendation_key(market, asset, timeframe, df, *options),
+        next_bar_close(timeframe),
+        lambda: research_executor.run(asset_job(asset, market, timeframe, df, evaluation, n_folds)),
+    )
@@ -0,0 +1,171 @@
+"""Background precomputation of recommendations for the default universes.
+
+Started with the API when ``scheduler_enabled`` is set. Shortly after each bar close
+the scheduler recomputes every universe entry of that timeframe through
+``cached_research`` with ``RecommendationRequest``'s defaults, so the matching
+requests are served from the recommendation cache (or join the computation already
+in flight) instead of starting their own.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from app.core.config import settings
+from app.recommendation.cache import INTERVAL_S, next_bar_close
+from app.research.pipeline import cached_research
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UniverseEntry:
+    market: str
+    asset: str
+    timeframe: str
+    priority: int = 1  # lower runs first
+
+
+def market_for(asset: str) -> str:
+    """Market of a ``Settings.default_assets`` symbol: ``EUR_USD`` is forex, ``ES1!`` futures, anything else crypto."""
+    if "_" in asset:
+        return "forex"
+    if asset.endswith("!"):
+        return "futures"
+    return "crypto"
+
+
+def default_universe() -> list[UniverseEntry]:
+    """The settings store's default assets (priority 0), then ``Settings.default_assets`` x ``default_timeframes``."""
+    from app.settings.store import get_settings_store
+
+    store = get_settings_store()
+    market, timeframe = store.get("default_market", "crypto"), store.get("default_timeframe", "1h")
+    candidates = [UniverseEntry(market, asset, timeframe, 0) for asset in store.get("default_assets") or []]
+    candidates += [UniverseEntry(market_for(asset), asset, tf) for asset in settings.default_assets for tf in settings.default_timeframes]
+    entries: dict[tuple, UniverseEntry] = {}
+    for entry in candidates:
+        if entry.timeframe in INTERVAL_S:
+            entries.setdefault((entry.market, entry.asset, entry.timeframe), entry)
+    return list(entries.values())
+
+
+class RecommendationScheduler:
+    """Queues each universe entry once per bar close of its timeframe and runs it in the background.
+
+    The queue is ordered by (priority, timeframe length), so the settings store's
+    defaults and the short, soon-to-expire timeframes go first. An entry already
+    waiting is not queued twice, and ``max_concurrency`` workers drain the queue: that
+    caps the scheduler's share of the research pool and spreads closes that coincide
+    (1m, 5m and 1h on the hour) out over time rather than running them as one burst.
+    """
+
+    def __init__(
+        self,
+        universe: Callable[[], list[UniverseEntry]] = default_universe,
+        max_concurrency: int | None = None,
+        lookback_bars: int | None = None,
+        delay_s: float | None = None,
+    ) -> None:
+        self.universe = universe
+        self.max_concurrency = max(1, settings.scheduler_max_concurrency if max_concurrency is None else max_concurrency)
+        self.lookback_bars = settings.scheduler_lookback_bars if lookback_bars is None else lookback_bars
+        self.delay_s = settings.scheduler_delay_s if delay_s is None else delay_s
+        self._queue: asyncio.PriorityQueue | None = None
+        self._queued: set[tuple] = set()
+        self._order = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self.runs = 0
+        self.failures = 0
+        self.deduplicated = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._clock())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queued.clear()
+
+    def enqueue(self, entry: UniverseEntry) -> bool:
+        key = (entry.market, entry.asset, entry.timeframe)
+        if key in self._queued:
+            self.deduplicated += 1
+            return False
+        self._queued.add(key)
+        self._queue.put_nowait(((entry.priority, INTERVAL_S[entry.timeframe]), next(self._order), entry))
+        return True
+
+    async def _clock(self) -> None:
+        scheduled: dict[str, float] = {}  # timeframe -> bar close it was last queued for
+        while True:
+            try:
+                entries = await asyncio.to_thread(self.universe)
+            except Exception:
+                logger.exception("loading the scheduler universe failed")
+                entries = []
+            now = time.time()
+            timeframes = {entry.timeframe for entry in entries}
+            # Start-up counts as a close, so everything is computed once right away.
+            latest = {tf: next_bar_close(tf, now) - INTERVAL_S[tf] for tf in timeframes}
+            for entry in entries:
+                if scheduled.get(entry.timeframe) != latest[entry.timeframe]:
+                    self.enqueue(entry)
+            scheduled.update(latest)
+            # Wait a little past the close so exchanges have published the closed candle.
+            wake = min((next_bar_close(tf, now) for tf in timeframes), default=now + 60) + self.delay_s
+            await asyncio.sleep(max(wake - time.time(), 0.0))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, entry = await self._queue.get()
+            self._queued.discard((entry.market, entry.asset, entry.timeframe))
+            try:
+                await self._run(entry)
+                self.runs += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.failures += 1
+                logger.warning("scheduled research of %s %s %s failed: %s", entry.market, entry.asset, entry.timeframe, exc)
+
+    async def _run(self, entry: UniverseEntry) -> None:
+        from app.data.connectors import get_connector
+
+        df = await get_connector(entry.market).fetch_ohlcv(entry.asset, entry.timeframe, self.lookback_bars)
+        if len(df):
+            await cached_research(entry.market, entry.asset, entry.timeframe, df)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "deduplicated": self.deduplicated,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+recommendation_scheduler: RecommendationScheduler | None = None
+
+
+def start_scheduler() -> RecommendationScheduler:
+    global recommendation_scheduler
+    scheduler = RecommendationScheduler()
+    scheduler.start()
+    recommendation_scheduler = scheduler
+    return scheduler
+
+
+async def stop_scheduler() -> None:
+    global recommendation_scheduler
+    if recommendation_scheduler is not None:
+        await recommendation_scheduler.stop()
+        recommendation_scheduler = None
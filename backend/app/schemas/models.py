@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field
 
 MarketType = Literal["crypto", "forex", "futures"]
 TimeFrame = Literal["1m", "5m", "1h", "1d", "1w"]
+EvaluationMode = Literal["in_sample", "walk_forward", "purged_kfold"]
 
 
 class StrategyPerformance(BaseModel):
@@ -18,6 +19,13 @@ class StrategyPerformance(BaseModel):
     suggested_direction: Literal["long", "short", "neutral"]
     confidence_score: float = Field(ge=0, le=100)
     favorable_conditions: str
+    oos_annualized_return: float | None = None
+    oos_max_drawdown: float | None = None
+    oos_sharpe_ratio: float | None = None
+    oos_sortino_ratio: float | None = None
+    oos_win_rate: float | None = None
+    oos_profit_factor: float | None = None
+    oos_folds: int | None = None
 
 
 class AssetRecommendation(BaseModel):
@@ -28,8 +36,23 @@ class AssetRecommendation(BaseModel):
     top_strategies: list[StrategyPerformance]
 
 
-class RecommendationRequest(BaseModel):
+class RecommendationEvent(BaseModel):
+    """One line of the ``/recommendations/stream`` NDJSON response."""
+
+    asset: str
+    status: Literal["ok", "error"]
+    result: AssetRecommendation | None = None
+    error: str | None = None
+
+
+class ScanRequest(BaseModel):
     assets: list[str]
     market: MarketType
     timeframe: TimeFrame = "1h"
     lookback_bars: int = 500
+    timeout_s: float | None = Field(default=None, gt=0)
+
+
+class RecommendationRequest(ScanRequest):
+    evaluation: EvaluationMode = "in_sample"
+    n_folds: int = Field(default=5, ge=2, le=20)
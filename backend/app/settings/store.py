@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import sqlite3
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 
 DB_PATH = Path(__file__).resolve().parents[1] / "local_state.db"
 
@@ -17,17 +21,44 @@ DEFAULT_SETTINGS = {
 }
 
 
+UPSERT = "INSERT INTO app_settings(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+
+
+def _decode(value: str):
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
 class SettingsStore:
+    """App settings persisted in SQLite and served from memory.
+
+    One long-lived WAL-mode connection is shared by all threads behind a lock.
+    Reads come from an immutable snapshot decoded once and tagged with ``version``;
+    each write is a single ``executemany`` transaction that then swaps in a new
+    snapshot, so lookups never touch the database. Writes made by other processes
+    are picked up by ``reload``. Snapshot values are shared and must not be mutated.
+    """
+
     def __init__(self, db_path: Path = DB_PATH) -> None:
         self.db_path = db_path
+        self.version = 0
+        self._lock = threading.Lock()
+        self._snapshot: Mapping[str, object] = MappingProxyType({})
+        self._conn = self._connect()
         self._init_db()
 
     def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+        # Access is serialized by ``_lock``, so the connection may be used from any thread.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
 
     def _init_db(self) -> None:
-        with self._connect() as conn:
-            conn.execute(
+        with self._lock, self._conn:
+            self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS app_settings (
                     key TEXT PRIMARY KEY,
@@ -35,37 +66,73 @@ class SettingsStore:
                 )
                 """
             )
-            conn.commit()
+        self.reload()
         self.seed_defaults()
 
     def seed_defaults(self) -> None:
-        current = self.get_all()
-        missing = {k: v for k, v in DEFAULT_SETTINGS.items() if k not in current}
+        missing = {k: v for k, v in DEFAULT_SETTINGS.items() if k not in self._snapshot}
         if not missing:
             return
         self.update_many(missing)
 
+    def reload(self) -> Mapping[str, object]:
+        """Re-read every row, e.g. after another process changed the database."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM app_settings").fetchall()
+            self._swap({key: _decode(value) for key, value in rows})
+            return self._snapshot
+
+    def _swap(self, values: dict) -> None:
+        self._snapshot = MappingProxyType(values)
+        self.version += 1
+
+    @property
+    def snapshot(self) -> Mapping[str, object]:
+        """Read-only view of the current settings; a new view replaces it on every write."""
+        return self._snapshot
+
+    def get(self, key: str, default=None):
+        return self._snapshot.get(key, default)
+
     def get_all(self) -> dict:
-        with self._connect() as conn:
-            rows = conn.execute("SELECT key, value FROM app_settings").fetchall()
-        out = {}
-        for key, value in rows:
-            try:
-                out[key] = json.loads(value)
-            except json.JSONDecodeError:
-                out[key] = value
-        return out
+        return dict(self._snapshot)
 
     def update_many(self, updates: dict) -> dict:
-        with self._connect() as conn:
-            for key, value in updates.items():
-                conn.execute(
-                    "INSERT INTO app_settings(key, value) VALUES(?, ?) "
-                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
-                    (key, json.dumps(value)),
-                )
-            conn.commit()
-        return self.get_all()
+        if not updates:
+            return self.get_all()
+        rows = [(key, json.dumps(value)) for key, value in updates.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(UPSERT, rows)
+            # Round-trip through JSON so the snapshot holds exactly what a reload would read.
+            self._swap({**self._snapshot, **{key: _decode(value) for key, value in rows}})
+            return dict(self._snapshot)
+
+    async def aupdate_many(self, updates: dict) -> dict:
+        """``update_many`` off the event loop; reads need no async variant as they never block."""
+        return await asyncio.to_thread(self.update_many, updates)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: SettingsStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_settings_store() -> SettingsStore:
+    """The process-wide store, opened on first use rather than at import."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SettingsStore()
+    return _store
 
 
-store = SettingsStore()
+def __getattr__(name: str):
+    # ``store`` used to be a module-level instance; keep ``from app.settings.store import store`` working, lazily.
+    if name == "store":
+        return get_settings_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
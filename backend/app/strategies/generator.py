@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import functools
+import threading
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable
 
 import numpy as np
-import optuna
 import pandas as pd
 
-from app.strategies.indicators import atr, bollinger, ema, macd, obv, rsi, sma, stochastic
+from app.backtesting.engine import SIGNAL_DTYPE, price_returns
+from app.core.metrics import timed
+from app.core.profiling import in_request_context
+from app.data.ohlcv import OHLCV
+from app.data.panel import Panel
+from app.strategies.indicators import BoundIndicators, IndicatorCache, atr, ema, indicator_cache, macd, mean_std, obv, rsi, sma, stochastic
+
+if TYPE_CHECKING:
+    import optuna
 
 
 @dataclass
@@ -14,6 +24,8 @@ class StrategySpec:
     name: str
     params: dict
     style: str
+    # Bump when a strategy's signal logic changes so cached results keyed on it are invalidated.
+    version: int = 1
 
 
 def base_strategies() -> list[StrategySpec]:
@@ -26,72 +38,261 @@ def base_strategies() -> list[StrategySpec]:
     ]
 
 
-def generate_signals(df: pd.DataFrame, spec: StrategySpec) -> pd.Series:
-    close, high, low, volume = df["close"], df["high"], df["low"], df["volume"]
+class _Buffers:
+    """Scratch arrays of one evaluator for one thread."""
 
-    if spec.name == "ema_trend_rsi":
-        fast = ema(close, spec.params["fast"])
-        slow = ema(close, spec.params["slow"])
-        rsi_val = rsi(close)
-        return pd.Series(
-            np.where(
-                (fast > slow) & (rsi_val > spec.params["rsi_high"]),
-                1,
-                np.where((fast < slow) & (rsi_val < spec.params["rsi_low"]), -1, 0),
-            ),
-            index=df.index,
-        )
-
-    if spec.name == "macd_stoch":
-        macd_line, signal = macd(close)
-        stoch = stochastic(high, low, close)
-        return pd.Series(
-            np.where(
-                (macd_line > signal) & (stoch < spec.params["stoch_low"]),
-                1,
-                np.where((macd_line < signal) & (stoch > spec.params["stoch_high"]), -1, 0),
-            ),
-            index=df.index,
-        )
+    __slots__ = ("long", "short", "mask", "work", "level", "signal", "signals", "strat", "gathered")
 
-    if spec.name == "bollinger_reversion":
-        upper, lower = bollinger(close, spec.params["window"], spec.params["std"])
-        return pd.Series(np.where(close < lower, 1, np.where(close > upper, -1, 0)), index=df.index)
+    def __init__(self, shape: tuple[int, ...]) -> None:
+        self.long = np.empty(shape, dtype=bool)
+        self.short = np.empty(shape, dtype=bool)
+        self.mask = np.empty(shape, dtype=bool)
+        self.work = np.empty(shape)
+        self.level = np.empty(shape)
+        self.signal = np.empty(shape, dtype=SIGNAL_DTYPE)
+        # (bars x parameter sets) scoring matrices, grown on demand.
+        self.signals = np.empty((shape[0], 0), dtype=SIGNAL_DTYPE)
+        self.strat = self.gathered = np.empty((shape[0], 0))
+
+
+class StrategyEvaluator:
+    """One strategy compiled against one dataset, for scoring many parameter sets.
+
+    Construction computes the indicators that no tuned parameter affects (RSI,
+    MACD/stochastic, OBV and its EMA trend); parameter-dependent ones go through
+    the ``IndicatorCache``. Signals and scores are written with in-place NumPy ops
+    into per-thread buffers allocated once, so a trial costs only the math its
+    parameters change. ``df`` may be candles or a ``Panel`` for ``signals``;
+    scoring needs a single asset.
+    """
+
+    def __init__(self, df: OHLCV | pd.DataFrame | Panel, spec: StrategySpec, cache: IndicatorCache | None = indicator_cache) -> None:
+        self.df = df
+        self.spec = spec
+        self.cache = cache
+        self.close = np.asarray(df["close"], dtype=float)
+        self._ind = BoundIndicators(df, cache)
+        self._invariant = self._precompute()
+        self._rows: dict[tuple, np.ndarray] = {}
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @functools.cached_property
+    def returns(self) -> np.ndarray:
+        return price_returns(self.close)
+
+    def head(self, n_bars: int) -> StrategyEvaluator:
+        """An evaluator over the first ``n_bars`` bars only."""
+        return StrategyEvaluator(self.df[:n_bars], self.spec, self.cache)
+
+    def _indicator(self, fn: Callable, *args):
+        value = self._ind(fn, *args)
+        if isinstance(value, tuple):
+            return tuple(np.asarray(v, dtype=float) for v in value)
+        return np.asarray(value, dtype=float)
+
+    def _precompute(self) -> dict[str, np.ndarray]:
+        if self.spec.name == "ema_trend_rsi":
+            return {"rsi": self._indicator(rsi, "close", 14)}
+        if self.spec.name == "macd_stoch":
+            macd_line, signal = self._indicator(macd, "close")
+            return {"stoch": self._indicator(stochastic, "high", "low", "close", 14), "rising": macd_line > signal, "falling": macd_line < signal}
+        if self.spec.name == "obv_trend_confirm":
+            trend = self._indicator(ema, "close", 20) - self._indicator(ema, "close", 50)
+            return {"obv": self._indicator(obv, "close", "volume"), "uptrend": trend > 0, "downtrend": trend < 0}
+        return {}
+
+    def _buffers(self) -> _Buffers:
+        buf = getattr(self._local, "buffers", None)
+        if buf is None:
+            buf = self._local.buffers = _Buffers(self.close.shape)
+        return buf
+
+    def signals(self, params: dict | None = None, out: np.ndarray | None = None) -> np.ndarray:
+        """Long (1), short (-1) or flat (0) per bar for ``params`` (default: the spec's), as int8.
+
+        Without ``out`` the result is this thread's signal buffer, overwritten by the
+        next call; copy it to keep it.
+        """
+        p = self.spec.params if params is None else params
+        inv = self._invariant
+        buf = self._buffers()
+        long, short, mask = buf.long, buf.short, buf.mask
+
+        if self.spec.name == "ema_trend_rsi":
+            fast = self._indicator(ema, "close", p["fast"])
+            slow = self._indicator(ema, "close", p["slow"])
+            np.greater(fast, slow, out=long)
+            long &= np.greater(inv["rsi"], p["rsi_high"], out=mask)
+            np.less(fast, slow, out=short)
+            short &= np.less(inv["rsi"], p["rsi_low"], out=mask)
+        elif self.spec.name == "macd_stoch":
+            np.less(inv["stoch"], p["stoch_low"], out=long)
+            long &= inv["rising"]
+            np.greater(inv["stoch"], p["stoch_high"], out=short)
+            short &= inv["falling"]
+        elif self.spec.name == "bollinger_reversion":
+            mid, std = self._indicator(mean_std, "close", p["window"])
+            band = np.multiply(std, p["std"], out=buf.work)
+            np.greater(self.close, np.add(mid, band, out=buf.level), out=short)
+            np.less(self.close, np.subtract(mid, band, out=buf.level), out=long)
+        elif self.spec.name == "obv_trend_confirm":
+            window = p["ma_window"]
+            obv_ma = self._ind.derived("obv_sma", (window,), lambda: sma(inv["obv"], window))
+            np.greater(inv["obv"], obv_ma, out=long)
+            long &= inv["uptrend"]
+            np.less(inv["obv"], obv_ma, out=short)
+            short &= inv["downtrend"]
+        else:
+            base = self._indicator(sma, "close", p["sma_window"])
+            band = np.multiply(self._indicator(atr, "high", "low", "close", p["atr_window"]), p["atr_mult"], out=buf.work)
+            np.greater(self.close, np.add(base, band, out=buf.level), out=long)
+            np.less(self.close, np.subtract(base, band, out=buf.level), out=short)
+
+        out = buf.signal if out is None else out
+        out.fill(0)
+        np.copyto(out, -1, where=short)
+        np.copyto(out, 1, where=long)
+        return out
+
+    def _segment_rows(self, segments: tuple[slice, ...]) -> np.ndarray:
+        key = tuple((s.start, s.stop, s.step) for s in segments)
+        rows = self._rows.get(key)
+        if rows is None:
+            bars = np.arange(len(self))
+            rows = self._rows[key] = np.concatenate([bars[s] for s in segments]) if segments else bars[:0]
+        return rows
+
+    def score_batch(self, params: list[dict], segments: tuple[slice, ...] | None = None) -> np.ndarray:
+        """Mean/std of each parameter set's cost-free strategy returns.
+
+        With ``segments`` only those bars of the history are scored (e.g. a fold's
+        training bars); slices past the end of the data are clipped.
+        """
+        buf = self._buffers()
+        k = len(params)
+        if buf.signals.shape[1] < k:
+            buf.signals = np.empty((len(self), k), dtype=SIGNAL_DTYPE)
+            buf.strat, buf.gathered = np.empty((len(self), k)), np.empty((len(self), k))
+        signals, strat = buf.signals[:, :k], buf.strat[:, :k]
+        for i, p in enumerate(params):
+            self.signals(p, out=signals[:, i])
+        strat[:1] = 0.0
+        np.multiply(signals[:-1], self.returns[1:, None], out=strat[1:])
+        if segments is not None:
+            rows = self._segment_rows(segments)
+            strat = np.take(strat, rows, axis=0, out=buf.gathered[: len(rows), :k], mode="clip")
 
+        n = strat.shape[0]
+        if n < 2:
+            return np.zeros(k)
+        mean = strat.mean(axis=0)
+        np.subtract(strat, mean, out=strat)
+        np.square(strat, out=strat)
+        std = np.sqrt(strat.sum(axis=0) / (n - 1))
+        return mean / (std + 1e-9)
+
+    def score(self, params: dict | None = None, segments: tuple[slice, ...] | None = None) -> float:
+        return float(self.score_batch([self.spec.params if params is None else params], segments)[0])
+
+
+@timed("generate_signals")
+def generate_signals(df: OHLCV | pd.DataFrame, spec: StrategySpec, cache: IndicatorCache | None = indicator_cache) -> pd.Series:
+    values = StrategyEvaluator(df, spec, cache).signals(out=np.empty(len(df), dtype=SIGNAL_DTYPE))
+    return pd.Series(values, index=df.index)
+
+
+@timed("generate_panel_signals")
+def generate_panel_signals(panel: Panel, spec: StrategySpec, cache: IndicatorCache | None = indicator_cache) -> np.ndarray:
+    """(bars x assets) signals for every asset of a panel, computed column-wise in one pass."""
+    evaluator = StrategyEvaluator(panel, spec, cache)
+    return evaluator.signals(out=np.empty(evaluator.close.shape, dtype=SIGNAL_DTYPE))
+
+
+OPTIMIZABLE = {"ema_trend_rsi", "bollinger_reversion", "obv_trend_confirm"}
+
+
+def _suggest(trial: optuna.Trial, spec: StrategySpec) -> dict:
+    params = spec.params.copy()
+    if spec.name == "ema_trend_rsi":
+        params["fast"] = trial.suggest_int("fast", 5, 30)
+        params["slow"] = trial.suggest_int("slow", 31, 120)
+        params["rsi_low"] = trial.suggest_int("rsi_low", 30, 49)
+        params["rsi_high"] = trial.suggest_int("rsi_high", 51, 70)
+    if spec.name == "bollinger_reversion":
+        params["window"] = trial.suggest_int("window", 10, 40)
+        params["std"] = trial.suggest_float("std", 1.2, 3.0)
     if spec.name == "obv_trend_confirm":
-        obv_line = obv(close, volume)
-        obv_ma = obv_line.rolling(spec.params["ma_window"]).mean()
-        trend = ema(close, 20) - ema(close, 50)
-        return pd.Series(np.where((obv_line > obv_ma) & (trend > 0), 1, np.where((obv_line < obv_ma) & (trend < 0), -1, 0)), index=df.index)
-
-    base = sma(close, spec.params["sma_window"])
-    a = atr(high, low, close, spec.params["atr_window"])
-    return pd.Series(
-        np.where(close > (base + spec.params["atr_mult"] * a), 1, np.where(close < (base - spec.params["atr_mult"] * a), -1, 0)),
-        index=df.index,
-    )
+        params["ma_window"] = trial.suggest_int("ma_window", 5, 40)
+    return params
+
 
+@timed("optimize_parameters")
+def optimize_parameters(
+    evaluator: StrategyEvaluator,
+    n_trials: int = 20,
+    n_jobs: int = 1,
+    prune: bool = False,
+    prune_fraction: float = 0.5,
+    batch_size: int = 1,
+    storage: str | None = None,
+    study_key: str | None = None,
+    segments: tuple[slice, ...] | None = None,
+) -> StrategySpec:
+    """Tune ``evaluator.spec.params`` with Optuna, maximizing ``evaluator.score``.
 
-def optimize_parameters(df: pd.DataFrame, spec: StrategySpec, score_fn, n_trials: int = 20) -> StrategySpec:
-    if spec.name not in {"ema_trend_rsi", "bollinger_reversion", "obv_trend_confirm"}:
+    ``segments`` restricts scoring to those bars (e.g. a fold's training set).
+    ``n_jobs`` runs trials in parallel threads. With ``prune`` each trial is first
+    scored on the leading ``prune_fraction`` of the history and stopped early by a
+    median pruner. With ``batch_size > 1`` trials are asked in batches and scored
+    together from a (bars x trials) signal matrix. Given a ``storage`` URL and
+    ``study_key`` the study persists across calls: its history seeds the sampler
+    and the previous best params are re-evaluated first. The result is the best
+    trial of this call.
+    """
+    spec = evaluator.spec
+    if spec.name not in OPTIMIZABLE:
         return spec
+    import optuna  # deferred: only tuning needs it, and it slows API start-up
+
+    head = evaluator.head(max(int(len(evaluator) * prune_fraction), 1)) if prune else None
 
     def objective(trial: optuna.Trial) -> float:
-        params = spec.params.copy()
-        if spec.name == "ema_trend_rsi":
-            params["fast"] = trial.suggest_int("fast", 5, 30)
-            params["slow"] = trial.suggest_int("slow", 31, 120)
-            params["rsi_low"] = trial.suggest_int("rsi_low", 30, 49)
-            params["rsi_high"] = trial.suggest_int("rsi_high", 51, 70)
-        if spec.name == "bollinger_reversion":
-            params["window"] = trial.suggest_int("window", 10, 40)
-            params["std"] = trial.suggest_float("std", 1.2, 3.0)
-        if spec.name == "obv_trend_confirm":
-            params["ma_window"] = trial.suggest_int("ma_window", 5, 40)
-        trial_spec = StrategySpec(spec.name, params, spec.style)
-        return score_fn(generate_signals(df, trial_spec))
-
-    study = optuna.create_study(direction="maximize")
-    study.optimize(objective, n_trials=n_trials, show_progress_bar=False)
-    final_params = spec.params | study.best_params
-    return StrategySpec(spec.name, final_params, spec.style)
+        params = _suggest(trial, spec)
+        if head is not None:
+            trial.report(head.score(params, segments), step=0)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        return evaluator.score(params, segments)
+
+    study = optuna.create_study(
+        direction="maximize",
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5) if prune else None,
+        storage=storage if study_key else None,
+        study_name=f"{study_key}:{spec.name}" if storage and study_key else None,
+        load_if_exists=bool(storage and study_key),
+    )
+    first_trial = len(study.trials)
+    completed = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    if completed:
+        study.enqueue_trial(max(completed, key=lambda t: t.value).params)
+
+    if batch_size > 1:
+        remaining = n_trials
+        while remaining > 0:
+            trials = [study.ask() for _ in range(min(batch_size, remaining))]
+            scores = evaluator.score_batch([_suggest(trial, spec) for trial in trials], segments)
+            for trial, score in zip(trials, scores, strict=True):
+                study.tell(trial, float(score))
+            remaining -= len(trials)
+    else:
+        # With n_jobs > 1 Optuna runs trials in its own threads, which would drop the request's timings.
+        study.optimize(in_request_context(objective), n_trials=n_trials, n_jobs=n_jobs, show_progress_bar=False)
+
+    finished = [t for t in study.trials[first_trial:] if t.state == optuna.trial.TrialState.COMPLETE]
+    if not finished:
+        return spec
+    best = max(finished, key=lambda t: t.value)
+    return replace(spec, params=spec.params | best.params)
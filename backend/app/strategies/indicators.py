@@ -1,15 +1,34 @@
 from __future__ import annotations
 
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable
+
 import numpy as np
 import pandas as pd
 
+from app.core import kernels
+from app.core.config import settings
+
+
+# Indicators take a Series, a (bars x assets) DataFrame from a panel, or a plain array
+# (e.g. an ``OHLCV`` column), and return the same kind.
+def _series(values: np.ndarray, like: pd.Series | pd.DataFrame | np.ndarray) -> pd.Series | pd.DataFrame | np.ndarray:
+    if isinstance(like, np.ndarray):
+        return values
+    if values.ndim == 2:
+        return pd.DataFrame(values, index=like.index, columns=like.columns, copy=False)
+    return pd.Series(values, index=like.index, name=like.name)
+
 
 def sma(series: pd.Series, window: int) -> pd.Series:
-    return series.rolling(window).mean()
+    return _series(kernels.rolling_mean(kernels.as_float_array(series), window), series)
 
 
 def ema(series: pd.Series, window: int) -> pd.Series:
-    return series.ewm(span=window, adjust=False).mean()
+    return _series(kernels.ewm_mean(kernels.as_float_array(series), window), series)
 
 
 def macd(series: pd.Series) -> tuple[pd.Series, pd.Series]:
@@ -19,33 +38,169 @@ def macd(series: pd.Series) -> tuple[pd.Series, pd.Series]:
 
 
 def rsi(series: pd.Series, window: int = 14) -> pd.Series:
-    diff = series.diff()
-    up = diff.clip(lower=0).rolling(window).mean()
-    down = -diff.clip(upper=0).rolling(window).mean()
-    rs = up / down.replace(0, np.nan)
-    return 100 - (100 / (1 + rs))
+    diff = kernels.diff(kernels.as_float_array(series))
+    up = kernels.rolling_mean(np.maximum(diff, 0), window)
+    down = kernels.rolling_mean(-np.minimum(diff, 0), window)
+    down[down == 0] = np.nan
+    np.divide(up, down, out=up)
+    up += 1
+    np.divide(100, up, out=up)
+    return _series(100 - up, series)
 
 
 def stochastic(high: pd.Series, low: pd.Series, close: pd.Series, window: int = 14) -> pd.Series:
-    ll = low.rolling(window).min()
-    hh = high.rolling(window).max()
-    return 100 * ((close - ll) / (hh - ll).replace(0, np.nan))
+    ll = kernels.rolling_min(kernels.as_float_array(low), window)
+    span = kernels.rolling_max(kernels.as_float_array(high), window)
+    span -= ll
+    span[span == 0] = np.nan
+    out = kernels.as_float_array(close) - ll
+    out /= span
+    out *= 100
+    return _series(out, close)
 
 
 def atr(high: pd.Series, low: pd.Series, close: pd.Series, window: int = 14) -> pd.Series:
-    tr = pd.concat(
-        [(high - low), (high - close.shift()).abs(), (low - close.shift()).abs()],
-        axis=1,
-    ).max(axis=1)
-    return tr.rolling(window).mean()
+    tr = kernels.true_range(kernels.as_float_array(high), kernels.as_float_array(low), kernels.as_float_array(close))
+    return _series(kernels.rolling_mean(tr, window), close)
+
+
+def mean_std(close: pd.Series, window: int = 20) -> tuple[pd.Series, pd.Series]:
+    mid, var = kernels.rolling_moments(kernels.as_float_array(close), window)
+    return _series(mid, close), _series(np.sqrt(var, out=var), close)
 
 
 def bollinger(close: pd.Series, window: int = 20, n_std: float = 2) -> tuple[pd.Series, pd.Series]:
-    mid = close.rolling(window).mean()
-    std = close.rolling(window).std()
-    return mid + n_std * std, mid - n_std * std
+    mid, std = mean_std(close, window)
+    band = np.multiply(std, n_std)
+    return mid + band, mid - band
 
 
 def obv(close: pd.Series, volume: pd.Series) -> pd.Series:
-    signed_volume = np.sign(close.diff().fillna(0)) * volume.fillna(0)
-    return signed_volume.cumsum()
+    direction = np.sign(np.nan_to_num(kernels.diff(kernels.as_float_array(close)), nan=0.0))
+    direction *= np.nan_to_num(kernels.as_float_array(volume), nan=0.0)
+    return _series(np.cumsum(direction, axis=0, out=direction), close)
+
+
+FINGERPRINT_COLUMNS = ("open", "high", "low", "close", "volume")
+
+_fingerprints: dict[int, str] = {}
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of OHLCV candles (frame, ``OHLCV`` or panel), memoized for the lifetime of the object.
+
+    Frames are treated as immutable once fetched; mutating one in place after it
+    has been fingerprinted will serve stale cached indicators.
+    """
+    key = id(df)
+    cached = _fingerprints.get(key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(df)).encode())
+    for col in FINGERPRINT_COLUMNS:
+        if col in df:
+            values = df[col]
+            digest.update(col.encode())
+            if values.ndim == 2:
+                digest.update("\0".join(map(str, values.columns)).encode())
+            digest.update(memoryview(np.ascontiguousarray(values, dtype=float)))
+    fingerprint = digest.hexdigest()
+    _fingerprints[key] = fingerprint
+    weakref.finalize(df, _fingerprints.pop, key, None)
+    return fingerprint
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return int(getattr(value, "nbytes", 0))
+
+
+class IndicatorCache:
+    """LRU memo of indicator outputs keyed by (dataset fingerprint, indicator, params).
+
+    Entries are evicted least-recently-used first once either ``max_entries`` or
+    ``max_bytes`` is exceeded. Cached Series are shared between callers and must
+    not be mutated.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = settings.indicator_cache_bytes) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, fingerprint: str, name: str, params: tuple, compute: Callable[[], object]):
+        key = (fingerprint, name, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        size = _nbytes(value)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.bytes += size
+                self._evict()
+        return value
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+indicator_cache = IndicatorCache()
+
+
+class BoundIndicators:
+    """Indicator calls against one frame, memoized through an ``IndicatorCache``.
+
+    ``ind(ema, "close", 20)`` resolves string arguments as columns of the frame and
+    caches the result under ``(fingerprint, "ema", ("close", 20))``.
+    """
+
+    __slots__ = ("df", "cache", "fingerprint")
+
+    def __init__(self, df: pd.DataFrame, cache: IndicatorCache | None = indicator_cache) -> None:
+        self.df = df
+        self.cache = cache
+        self.fingerprint = dataset_fingerprint(df) if cache is not None else ""
+
+    def __call__(self, fn: Callable, *args):
+        def compute():
+            return fn(*(self.df[a] if isinstance(a, str) else a for a in args))
+
+        return self.derived(fn.__name__, args, compute)
+
+    def derived(self, name: str, params: tuple, compute: Callable[[], object]):
+        if self.cache is None:
+            return compute()
+        return self.cache.get(self.fingerprint, name, params, compute)
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import math
+from array import array
+from collections import deque
+from typing import Iterable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+from app.strategies.generator import SIGNAL_DTYPE, StrategySpec
+
+NAN = float("nan")
+
+
+class _RollingWindow:
+    """Fixed-size ring buffer with a running mean and sum of squared deviations.
+
+    Uses the same add/remove updates as pandas' rolling mean/var so streamed values
+    track the batch results to floating-point tolerance. NaN inputs make the
+    window incomplete until they roll out, matching ``min_periods=window``.
+    """
+
+    __slots__ = ("window", "values", "pos", "count", "nans", "mean", "ssqdm")
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.values = array("d", [NAN] * window)
+        self.pos = 0
+        self.count = 0
+        self.nans = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+
+    def _add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.ssqdm += delta * (x - self.mean)
+
+    def _remove(self, x: float) -> None:
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.count
+        self.ssqdm -= delta * (x - self.mean)
+
+    def push(self, x: float) -> None:
+        old = self.values[self.pos]
+        full = self.count + self.nans == self.window
+        if full:
+            if math.isnan(old):
+                self.nans -= 1
+            else:
+                self._remove(old)
+        self.values[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        if math.isnan(x):
+            self.nans += 1
+        else:
+            self._add(x)
+
+    @property
+    def ready(self) -> bool:
+        return self.count == self.window
+
+    def sma(self) -> float:
+        return self.mean if self.ready else NAN
+
+    def std(self) -> float:
+        if not self.ready or self.window < 2:
+            return NAN
+        return math.sqrt(max(self.ssqdm, 0.0) / (self.window - 1))
+
+
+class StreamingSMA:
+    __slots__ = ("_win",)
+
+    def __init__(self, window: int) -> None:
+        self._win = _RollingWindow(window)
+
+    def update(self, x: float) -> float:
+        self._win.push(x)
+        return self._win.sma()
+
+
+class StreamingEMA:
+    """pandas' ``ewm(adjust=False)`` recursion: NaN inputs hold the value and carry their decay into the next update."""
+
+    __slots__ = ("alpha", "value", "_old_wt")
+
+    def __init__(self, window: int) -> None:
+        self.alpha = 2.0 / (window + 1)
+        self.value = NAN
+        self._old_wt = 1.0
+
+    def update(self, x: float) -> float:
+        if math.isnan(self.value):
+            self.value = x
+            return self.value
+        self._old_wt *= 1 - self.alpha
+        if not math.isnan(x):
+            if self.value != x:
+                self.value = (self._old_wt * self.value + self.alpha * x) / (self._old_wt + self.alpha)
+            self._old_wt = 1.0
+        return self.value
+
+
+class StreamingMACD:
+    __slots__ = ("_fast", "_slow", "_signal")
+
+    def __init__(self) -> None:
+        self._fast = StreamingEMA(12)
+        self._slow = StreamingEMA(26)
+        self._signal = StreamingEMA(9)
+
+    def update(self, close: float) -> tuple[float, float]:
+        line = self._fast.update(close) - self._slow.update(close)
+        return line, self._signal.update(line)
+
+
+class StreamingRSI:
+    __slots__ = ("_prev", "_up", "_down")
+
+    def __init__(self, window: int = 14) -> None:
+        self._prev = NAN
+        self._up = _RollingWindow(window)
+        self._down = _RollingWindow(window)
+
+    def update(self, close: float) -> float:
+        diff = close - self._prev
+        self._prev = close
+        self._up.push(max(diff, 0.0) if not math.isnan(diff) else NAN)
+        self._down.push(-min(diff, 0.0) if not math.isnan(diff) else NAN)
+        up, down = self._up.sma(), self._down.sma()
+        if math.isnan(up) or math.isnan(down) or down == 0:
+            return NAN
+        return 100 - (100 / (1 + up / down))
+
+
+class _MonotonicExtreme:
+    """Sliding-window max (or min) in amortized O(1) via a monotonic deque."""
+
+    __slots__ = ("window", "sign", "items", "index")
+
+    def __init__(self, window: int, maximum: bool) -> None:
+        self.window = window
+        self.sign = 1.0 if maximum else -1.0
+        self.items: deque[tuple[int, float]] = deque()
+        self.index = 0
+
+    def update(self, x: float) -> float:
+        key = self.sign * x
+        while self.items and self.sign * self.items[-1][1] <= key:
+            self.items.pop()
+        self.items.append((self.index, x))
+        if self.items[0][0] <= self.index - self.window:
+            self.items.popleft()
+        self.index += 1
+        return self.items[0][1] if self.index >= self.window else NAN
+
+
+class StreamingStochastic:
+    __slots__ = ("_hh", "_ll")
+
+    def __init__(self, window: int = 14) -> None:
+        self._hh = _MonotonicExtreme(window, maximum=True)
+        self._ll = _MonotonicExtreme(window, maximum=False)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        hh, ll = self._hh.update(high), self._ll.update(low)
+        span = hh - ll
+        if math.isnan(span) or span == 0:
+            return NAN
+        return 100 * ((close - ll) / span)
+
+
+class StreamingATR:
+    __slots__ = ("_prev", "_win")
+
+    def __init__(self, window: int = 14) -> None:
+        self._prev = NAN
+        self._win = _RollingWindow(window)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if not math.isnan(self._prev):
+            tr = max(tr, abs(high - self._prev), abs(low - self._prev))
+        self._prev = close
+        self._win.push(tr)
+        return self._win.sma()
+
+
+class StreamingBollinger:
+    __slots__ = ("n_std", "_win")
+
+    def __init__(self, window: int = 20, n_std: float = 2) -> None:
+        self.n_std = n_std
+        self._win = _RollingWindow(window)
+
+    def update(self, close: float) -> tuple[float, float]:
+        self._win.push(close)
+        mid, std = self._win.sma(), self._win.std()
+        return mid + self.n_std * std, mid - self.n_std * std
+
+
+class StreamingOBV:
+    __slots__ = ("_prev", "value")
+
+    def __init__(self) -> None:
+        self._prev = NAN
+        self.value = 0.0
+
+    def update(self, close: float, volume: float) -> float:
+        if not math.isnan(self._prev) and not math.isnan(volume):
+            diff = close - self._prev
+            self.value += volume if diff > 0 else -volume if diff < 0 else 0.0
+        self._prev = close
+        return self.value
+
+
+def _vote(long_cond: bool, short_cond: bool) -> int:
+    return 1 if long_cond else -1 if short_cond else 0
+
+
+class StreamingSignal:
+    """O(1)-per-bar signal generator equivalent to ``generate_signals`` for one spec."""
+
+    __slots__ = ("spec", "_ind")
+
+    def __init__(self, spec: StrategySpec) -> None:
+        self.spec = spec
+        p = spec.params
+        if spec.name == "ema_trend_rsi":
+            self._ind = (StreamingEMA(p["fast"]), StreamingEMA(p["slow"]), StreamingRSI())
+        elif spec.name == "macd_stoch":
+            self._ind = (StreamingMACD(), StreamingStochastic())
+        elif spec.name == "bollinger_reversion":
+            self._ind = (StreamingBollinger(p["window"], p["std"]),)
+        elif spec.name == "obv_trend_confirm":
+            self._ind = (StreamingOBV(), StreamingSMA(p["ma_window"]), StreamingEMA(20), StreamingEMA(50))
+        else:
+            self._ind = (StreamingSMA(p["sma_window"]), StreamingATR(p["atr_window"]))
+
+    def update(self, high: float, low: float, close: float, volume: float) -> int:
+        name, p = self.spec.name, self.spec.params
+        if name == "ema_trend_rsi":
+            fast_ema, slow_ema, rsi_ind = self._ind
+            fast, slow, rsi_val = fast_ema.update(close), slow_ema.update(close), rsi_ind.update(close)
+            return _vote((fast > slow) and (rsi_val > p["rsi_high"]), (fast < slow) and (rsi_val < p["rsi_low"]))
+        if name == "macd_stoch":
+            macd_ind, stoch_ind = self._ind
+            line, signal = macd_ind.update(close)
+            stoch = stoch_ind.update(high, low, close)
+            return _vote((line > signal) and (stoch < p["stoch_low"]), (line < signal) and (stoch > p["stoch_high"]))
+        if name == "bollinger_reversion":
+            upper, lower = self._ind[0].update(close)
+            return _vote(close < lower, close > upper)
+        if name == "obv_trend_confirm":
+            obv_ind, obv_sma, ema20, ema50 = self._ind
+            obv_line = obv_ind.update(close, volume)
+            obv_ma = obv_sma.update(obv_line)
+            trend = ema20.update(close) - ema50.update(close)
+            return _vote((obv_line > obv_ma) and (trend > 0), (obv_line < obv_ma) and (trend < 0))
+        sma_ind, atr_ind = self._ind
+        base, a = sma_ind.update(close), atr_ind.update(high, low, close)
+        return _vote(close > (base + p["atr_mult"] * a), close < (base - p["atr_mult"] * a))
+
+
+def stream_signals(candles: Iterable[Mapping[str, float]], spec: StrategySpec) -> Iterator[int]:
+    """Yield one signal per incoming candle without recomputing any window."""
+    gen = StreamingSignal(spec)
+    for candle in candles:
+        yield gen.update(candle["high"], candle["low"], candle["close"], candle["volume"])
+
+
+def replay_signals(df: pd.DataFrame, spec: StrategySpec) -> pd.Series:
+    """Run a whole frame through the streaming generator, e.g. to check it against ``generate_signals``."""
+    gen = StreamingSignal(spec)
+    cols = [np.asarray(df[c], dtype=float).tolist() for c in ("high", "low", "close", "volume")]
+    values = np.fromiter((gen.update(h, l, c, v) for h, l, c, v in zip(*cols)), dtype=SIGNAL_DTYPE, count=len(df))
+    return pd.Series(values, index=df.index)
@@ -0,0 +1,223 @@
+"""Benchmarks for the research pipeline hot paths.
+
+Run from ``backend/``::
+
+    python -m benchmarks.run --sizes 1000 10000 --save benchmarks/baselines/local.json
+    python -m benchmarks.run --sizes 1000 10000 --compare benchmarks/baselines/local.json
+
+Data comes from ``SyntheticConnector`` and is deterministic per (symbol, timeframe,
+bars). ``--compare`` exits non-zero when a case's p50 latency regresses by more
+than ``--threshold`` against the baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import optuna
+import pandas as pd
+
+from app.backtesting.engine import backtest, backtest_chunked
+from app.data.connectors import SyntheticConnector
+from app.data.ohlcv import OHLCV
+from app.data.panel import build_panel
+from app.recommendation.engine import recommend_panel
+from app.recommendation.cache import recommendation_cache
+from app.regime.detector import detect_regime, regime_service
+from app.strategies import indicators
+from app.strategies.generator import OPTIMIZABLE, StrategyEvaluator, base_strategies, generate_signals, optimize_parameters
+from app.strategies.indicators import indicator_cache
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SYMBOL = "BENCH"
+TIMEFRAME = "1h"
+PANEL_ASSETS = 20
+
+
+@dataclass
+class Case:
+    name: str
+    build: Callable[[OHLCV], Callable[[], object]]
+    max_bars: int | None = None
+
+
+def _load(bars: int, symbol: str = SYMBOL) -> OHLCV:
+    return asyncio.run(SyntheticConnector("oanda").fetch_ohlcv(symbol, TIMEFRAME, bars))
+
+
+def _panel_recommend(df: OHLCV) -> Callable[[], object]:
+    frames = {f"{SYMBOL}{i}": _load(len(df), f"{SYMBOL}{i}") for i in range(PANEL_ASSETS)}
+    panel = build_panel(frames)
+    regimes = {asset: "unknown" for asset in frames}
+    return lambda: recommend_panel(panel, TIMEFRAME, regimes, base_strategies())
+
+
+def _recommendations_request(df: OHLCV) -> Callable[[], object]:
+    import httpx
+
+    from app.main import app
+
+    payload = {"assets": [SYMBOL], "market": "forex", "timeframe": TIMEFRAME, "lookback_bars": len(df)}
+
+    async def call() -> None:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.post("/api/recommendations", json=payload, timeout=None)
+            response.raise_for_status()
+
+    return lambda: asyncio.run(call())
+
+
+def _cases() -> list[Case]:
+    cases = [
+        Case("indicator.sma", lambda df: lambda: indicators.sma(df["close"], 20)),
+        Case("indicator.ema", lambda df: lambda: indicators.ema(df["close"], 20)),
+        Case("indicator.macd", lambda df: lambda: indicators.macd(df["close"])),
+        Case("indicator.rsi", lambda df: lambda: indicators.rsi(df["close"])),
+        Case("indicator.stochastic", lambda df: lambda: indicators.stochastic(df["high"], df["low"], df["close"])),
+        Case("indicator.atr", lambda df: lambda: indicators.atr(df["high"], df["low"], df["close"])),
+        Case("indicator.bollinger", lambda df: lambda: indicators.bollinger(df["close"])),
+        Case("indicator.obv", lambda df: lambda: indicators.obv(df["close"], df["volume"])),
+    ]
+    for spec in base_strategies():
+        cases.append(Case(f"generate_signals.{spec.name}", lambda df, spec=spec: lambda: generate_signals(df, spec, cache=None)))
+    for spec in base_strategies():
+        # Per-trial cost: invariants precomputed, parameter-dependent indicators recomputed on every call.
+        cases.append(Case(f"evaluator.score.{spec.name}", lambda df, spec=spec: StrategyEvaluator(df, spec, cache=None).score))
+    for spec in base_strategies():
+        def build_backtest(df: OHLCV, spec=spec) -> Callable[[], object]:
+            signal = generate_signals(df, spec, cache=None)
+            return lambda: backtest(df, signal, TIMEFRAME, 5.0, 2.0)
+
+        cases.append(Case(f"backtest.{spec.name}", build_backtest))
+
+    def build_chunked(df: OHLCV) -> Callable[[], object]:
+        signals = np.column_stack([generate_signals(df, spec, cache=None).to_numpy() for spec in base_strategies()])
+        return lambda: backtest_chunked(df["close"], signals, TIMEFRAME, 5.0, 2.0, equity_every=100)
+
+    cases.append(Case("backtest_chunked.all_strategies", build_chunked))
+    cases.append(Case("detect_regime", lambda df: lambda: detect_regime(df)))
+    for spec in base_strategies():
+        if spec.name not in OPTIMIZABLE:
+            continue
+        cases.append(
+            Case(
+                f"optimize_parameters.{spec.name}",
+                lambda df, spec=spec: lambda: optimize_parameters(StrategyEvaluator(df, spec), n_trials=10),
+                max_bars=100_000,
+            )
+        )
+    cases.append(Case(f"recommend_panel.{PANEL_ASSETS}_assets", _panel_recommend, max_bars=100_000))
+    cases.append(Case("api.recommendations", _recommendations_request, max_bars=100_000))
+    return cases
+
+
+def _reset_caches() -> None:
+    indicator_cache.clear()
+    regime_service.clear()
+    recommendation_cache.clear()
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> dict:
+    _reset_caches()
+    fn()  # warm-up: imports, lazy pools, allocator
+
+    timings = []
+    for _ in range(repeat):
+        _reset_caches()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    _reset_caches()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings_ms = np.array(timings) * 1000
+    return {
+        "p50_ms": float(np.percentile(timings_ms, 50)),
+        "p99_ms": float(np.percentile(timings_ms, 99)),
+        "peak_mem_mb": peak / 2**20,
+    }
+
+
+def run(sizes: list[int], selected: list[str] | None, repeat: int, full: bool) -> dict:
+    results: dict[str, dict[str, dict]] = {}
+    cases = [c for c in _cases() if not selected or any(c.name.startswith(s) for s in selected)]
+    for bars in sizes:
+        df = _load(bars)
+        for case in cases:
+            if case.max_bars is not None and bars > case.max_bars and not full:
+                continue
+            stats = _measure(case.build(df), repeat)
+            stats["throughput_bars_s"] = bars / (stats["p50_ms"] / 1000) if stats["p50_ms"] else float("inf")
+            results.setdefault(case.name, {})[str(bars)] = stats
+            print(
+                f"{case.name:<42} {bars:>9} bars  p50 {stats['p50_ms']:>10.2f} ms  p99 {stats['p99_ms']:>10.2f} ms  "
+                f"{stats['throughput_bars_s']:>14,.0f} bars/s  peak {stats['peak_mem_mb']:>8.1f} MB",
+                flush=True,
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, by_size in results.items():
+        for bars, stats in by_size.items():
+            base = baseline.get("results", {}).get(name, {}).get(bars)
+            if base and stats["p50_ms"] > base["p50_ms"] * (1 + threshold):
+                regressions.append(f"{name} @ {bars} bars: p50 {stats['p50_ms']:.2f} ms vs baseline {base['p50_ms']:.2f} ms")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", help="case name prefixes, e.g. indicator backtest api")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--full", action="store_true", help="run optimizer and end-to-end cases above 100k bars")
+    parser.add_argument("--save", type=Path, help="write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    results = run(args.sizes, args.cases, args.repeat, args.full)
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2))
+        print(f"saved baseline to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
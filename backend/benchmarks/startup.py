@@ -0,0 +1,93 @@
+"""Start-up benchmarks: import cost of ``app.main`` and time to the first ``/api/health``.
+
+Run from ``backend/``::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --save benchmarks/baselines/startup.json
+
+Each measurement starts a fresh interpreter. The import report comes from
+``python -X importtime`` and lists the packages with the largest self time, so a
+heavy dependency creeping back onto the import path shows up by name.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+MODULE = "app.main"
+
+
+def import_report(module: str = MODULE) -> tuple[float, list[tuple[str, float]]]:
+    """Total import time of ``module`` and per-top-level-package self time, both in ms."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True)
+    total_us = 0
+    by_package: dict[str, int] = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        name = name.strip()
+        by_package[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    packages = sorted(((name, us / 1000) for name, us in by_package.items()), key=lambda item: -item[1])
+    return total_us / 1000, packages
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_health(timeout_s: float = 60.0) -> float:
+    """Seconds from spawning uvicorn to the first successful ``/api/health`` response."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"])
+    try:
+        while time.perf_counter() - started < timeout_s:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/api/health did not answer within {timeout_s:.0f}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="packages to list by import self time")
+    parser.add_argument("--save", type=Path)
+    args = parser.parse_args(argv)
+
+    imports = [import_report() for _ in range(args.repeat)]
+    import_ms = statistics.median(total for total, _ in imports)
+    health_s = statistics.median(time_to_health() for _ in range(args.repeat))
+
+    print(f"import {MODULE:<24} p50 {import_ms:>8.1f} ms")
+    print(f"time to first /api/health      p50 {health_s * 1000:>8.1f} ms")
+    packages = imports[-1][1][: args.top]
+    for name, ms in packages:
+        print(f"  {name:<28} {ms:>8.1f} ms")
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({"import_ms": import_ms, "time_to_health_ms": health_s * 1000, "packages_ms": dict(packages)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
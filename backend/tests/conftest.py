@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import importlib.util
+
+import pytest
+
+from app.core import kernels
+
+
+@pytest.fixture(params=[False, pytest.param(True, marks=pytest.mark.skipif(importlib.util.find_spec("numba") is None, reason="numba not installed"))], ids=["numpy", "numba"])
+def use_numba(request, monkeypatch):
+    """Runs a test once with the NumPy kernels and once with the Numba ones."""
+    monkeypatch.setattr(kernels, "USE_NUMBA", request.param)
+    return request.param
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.backtesting import engine
+from app.backtesting.engine import StreamingBacktest, backtest_batch, backtest_chunked
+
+BARS = 500
+KEYS = ("cagr", "sharpe", "sortino", "max_drawdown", "win_rate", "profit_factor", "trades")
+
+
+@pytest.fixture
+def close() -> np.ndarray:
+    rng = np.random.default_rng(7)
+    return 100 * np.cumprod(1 + rng.normal(0, 0.01, BARS))
+
+
+@pytest.fixture
+def signals() -> np.ndarray:
+    """int8 signals held for 25 bars at a time, so positions straddle most chunk boundaries."""
+    rng = np.random.default_rng(8)
+    return np.repeat(rng.integers(-1, 2, size=(BARS // 25, 40)).astype(np.int8), 25, axis=0)
+
+
+def assert_same_metrics(actual: dict, expected: dict) -> None:
+    for key in KEYS:
+        np.testing.assert_allclose(actual[key], expected[key], rtol=1e-9, atol=1e-12, err_msg=key)
+    np.testing.assert_array_equal(actual["direction"], expected["direction"])
+
+
+@pytest.mark.parametrize("chunk_bars", [1, 7, 64, BARS])
+def test_chunked_matches_batch(close, signals, chunk_bars, monkeypatch):
+    monkeypatch.setattr(engine, "BATCH_COLUMNS", 16)
+    assert_same_metrics(backtest_chunked(close, signals, "1h", 5, 2, chunk_bars=chunk_bars), backtest_batch(close, signals, "1h", 5, 2))
+
+
+def test_chunk_boundary_mid_position(close):
+    signals = np.zeros(BARS, dtype=np.int8)
+    signals[90:130] = 1
+    signals[300:301] = -1
+    expected = backtest_batch(close, signals, "1d", 10, 0)
+    actual = backtest_chunked(close, signals, "1d", 10, 0, chunk_bars=100)
+    assert_same_metrics(actual, expected)
+    assert actual["trades"][0] == expected["trades"][0] == 4
+
+
+@pytest.mark.parametrize("dtype", [float, bool])
+def test_float_and_bool_signals(close, signals, dtype):
+    values = signals > 0 if dtype is bool else signals.astype(float)
+    expected = backtest_batch(close, values.astype(np.int8), "1h", 5, 2)
+    assert_same_metrics(backtest_batch(close, values, "1h", 5, 2), expected)
+    assert_same_metrics(backtest_chunked(close, values, "1h", 5, 2, chunk_bars=33), expected)
+
+
+def test_per_column_close(close, signals, monkeypatch):
+    monkeypatch.setattr(engine, "BATCH_COLUMNS", 16)
+    prices = close[:, None] * np.linspace(0.5, 2.0, signals.shape[1])
+    prices[:, ::3] = prices[::-1, ::3]
+    assert_same_metrics(backtest_chunked(prices, signals, "1h", 5, 2, chunk_bars=50), backtest_batch(prices, signals, "1h", 5, 2))
+
+
+def test_streaming_equity_curve(close, signals, monkeypatch):
+    monkeypatch.setattr(engine, "BATCH_COLUMNS", 16)
+    expected = backtest_batch(close, signals, "1h", 5, 2, return_equity=True)["equity"]
+    metrics = backtest_chunked(close, signals, "1h", 5, 2, chunk_bars=45, equity_every=10)
+    np.testing.assert_array_equal(metrics["equity_bars"], np.r_[np.arange(0, BARS, 10), BARS - 1])
+    np.testing.assert_allclose(metrics["equity"], expected[metrics["equity_bars"]], rtol=1e-12)
+
+
+def test_streaming_backtest_updates(close, signals):
+    state = StreamingBacktest(signals.shape[1], "1h", 5, 2)
+    for start, stop in [(0, 1), (1, 2), (2, 250), (250, 251), (251, BARS)]:
+        state.update(close[start:stop], signals[start:stop])
+    state.update(close[:0], signals[:0])
+    assert state.bars == BARS
+    assert_same_metrics(state.metrics(), backtest_batch(close, signals, "1h", 5, 2))
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.data import http
+from app.data.http import ExchangeSession, TokenBucket
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list[float]:
+    """Backoff delays requested by the session; the sleeps themselves are skipped."""
+    delays: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds: float) -> None:
+        delays.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(http.asyncio, "sleep", sleep)
+    monkeypatch.setattr(http.random, "random", lambda: 0.0)
+    return delays
+
+
+def scripted(*responses: httpx.Response | Exception) -> tuple[httpx.MockTransport, list[httpx.Request]]:
+    requests: list[httpx.Request] = []
+    queue = list(responses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        result = queue.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return httpx.MockTransport(handler), requests
+
+
+def get_json(session: ExchangeSession, **kwargs):
+    async def run():
+        try:
+            return await session.get_json("/api/v3/klines", {"symbol": "BTCUSDT"}, **kwargs)
+        finally:
+            await session.aclose()
+
+    return asyncio.run(run())
+
+
+def test_retries_throttled_and_server_errors_with_backoff(sleeps):
+    transport, requests = scripted(
+        httpx.Response(429),
+        httpx.Response(503),
+        httpx.ConnectError("refused"),
+        httpx.Response(200, json=[[1, "2"]]),
+    )
+    session = ExchangeSession("stub", "https://stub", max_retries=3, backoff_s=0.1, transport=transport)
+    assert get_json(session) == [[1, "2"]]
+    assert len(requests) == 4 and requests[0].url.params["symbol"] == "BTCUSDT"
+    assert sleeps == [0.1, 0.2, 0.4]
+    assert (session.stats.requests, session.stats.errors, session.stats.retries) == (3, 3, 3)
+
+
+def test_retry_after_header_overrides_backoff(sleeps):
+    transport, _ = scripted(httpx.Response(418, headers={"retry-after": "7"}), httpx.Response(200, json={}))
+    get_json(ExchangeSession("stub", "https://stub", transport=transport))
+    assert sleeps == [7.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    transport, requests = scripted(*[httpx.Response(500)] * 3)
+    with pytest.raises(httpx.HTTPStatusError):
+        get_json(ExchangeSession("stub", "https://stub", max_retries=2, backoff_s=0.1, transport=transport))
+    assert len(requests) == 3 and sleeps == [0.1, 0.2]
+
+
+def test_client_errors_are_not_retried(sleeps):
+    transport, requests = scripted(httpx.Response(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        get_json(ExchangeSession("stub", "https://stub", transport=transport))
+    assert len(requests) == 1 and sleeps == []
+
+
+def test_weight_is_spent_and_synced_with_the_used_weight_header(monkeypatch):
+    transport, _ = scripted(httpx.Response(200, json={}, headers={"x-used-weight": "90"}))
+    session = ExchangeSession("stub", "https://stub", weight_per_minute=100, weight_header="x-used-weight", transport=transport)
+    spent: list[float] = []
+    acquire = TokenBucket.acquire
+
+    async def record(bucket: TokenBucket, weight: float) -> None:
+        await acquire(bucket, weight)
+        spent.append(bucket.tokens)
+
+    monkeypatch.setattr(TokenBucket, "acquire", record)
+
+    async def run():
+        await session.get_json("/x", weight=5)
+        bound = session._bind()
+        await session.aclose()
+        return bound.bucket
+
+    bucket = asyncio.run(run())
+    assert spent == [pytest.approx(95, abs=0.1)]
+    assert bucket.tokens == pytest.approx(10, abs=0.1)
+
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(4, per_seconds=0.2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(6):
+            await bucket.acquire(1)
+        return loop.time() - started
+
+    # Four requests fit the budget; the next two wait for 0.05 s of refill each.
+    assert 0.08 <= asyncio.run(run()) < 1.0
+
+
+def test_defaults_follow_settings_changed_after_import(monkeypatch):
+    monkeypatch.setattr(settings, "exchange_max_concurrency", 3)
+    monkeypatch.setattr(settings, "http_max_retries", 5)
+    monkeypatch.setattr(settings, "http_timeout_s", 2.5)
+    session = ExchangeSession("stub", "https://stub")
+    assert (session.max_concurrency, session.max_retries, session.timeout_s) == (3, 5, 2.5)
+
+
+def test_one_client_per_event_loop():
+    transport, _ = scripted(*[httpx.Response(200, json={})] * 2)
+    session = ExchangeSession("stub", "https://stub", transport=transport)
+    clients: list[httpx.AsyncClient] = []
+
+    async def request():
+        await session.get_json("/x")
+        clients.append(session._bind().client)
+
+    asyncio.run(request())
+    asyncio.run(request())
+    assert clients[0] is not clients[1]
+    # The first loop is closed, so its client was dropped when the second one was bound.
+    assert [bound.client for bound in session._clients.values()] == [clients[1]]
+
+
+def test_aclose_closes_the_clients_of_every_running_loop():
+    transport, _ = scripted(*[httpx.Response(200, json={})] * 2)
+    session = ExchangeSession("stub", "https://stub", transport=transport)
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(session.get_json("/x"), other).result(timeout=5)
+
+        async def run():
+            await session.get_json("/x")
+            clients = [bound.client for bound in session._clients.values()]
+            await session.aclose()
+            return clients
+
+        clients = asyncio.run(run())
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join()
+        other.close()
+    assert len(clients) == 2 and all(client.is_closed for client in clients)
+    assert session._clients == {}
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.data import ingestion
+from app.data.ingestion import IngestionService, LiveConnector, ReplayFeed
+
+MINUTE_MS = 60_000
+
+
+def candles(start: int, n: int) -> dict[str, np.ndarray]:
+    open_time = np.arange(start, start + n) * MINUTE_MS
+    return {"open_time": open_time, "close_time": open_time + MINUTE_MS - 1} | {
+        col: open_time / MINUTE_MS + k for k, col in enumerate(["open", "high", "low", "close", "volume"])
+    }
+
+
+class FailingFeed(ReplayFeed):
+    """A replay whose first ``failures`` connections raise after ``after`` events."""
+
+    def __init__(self, *args, failures: int, after: int, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.after = after
+
+    async def events(self):
+        emitted = 0
+        async for event in super().events():
+            if self.failures and emitted == self.after:
+                self.failures -= 1
+                raise ConnectionResetError("feed dropped")
+            emitted += 1
+            yield event
+
+
+@pytest.fixture
+def no_backoff(monkeypatch) -> list[float]:
+    delays: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds: float) -> None:
+        delays.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(ingestion.asyncio, "sleep", sleep)
+    return delays
+
+
+def test_feed_failures_are_logged_and_the_feed_restarted(no_backoff, caplog):
+    feed = FailingFeed({("BTCUSDT", "1m"): candles(0, 300)}, warm_bars=100, failures=2, after=10)
+    service = IngestionService(feed, feed, history_bars=100)
+
+    async def run():
+        service.start([("BTCUSDT", "1m")])
+        await asyncio.wait_for(service._runner, 5)
+        return service.read("BTCUSDT", "1m", 50)
+
+    latest = asyncio.run(run())
+    assert np.array_equal(np.asarray(latest["close"]), candles(0, 300)["close"][-50:])
+    assert service.feed_failures == 2 and service.feed_error is None
+    assert [d for d in no_backoff if d >= 1] == [1.0, 2.0]
+    assert caplog.text.count("candle feed failed") == 2
+
+
+def test_health_reports_a_failing_feed(no_backoff, monkeypatch):
+    from app.api.routes import health
+
+    feed = FailingFeed({("BTCUSDT", "1m"): candles(0, 300)}, warm_bars=100, failures=1, after=0)
+    service = IngestionService(feed, feed, history_bars=100)
+    monkeypatch.setattr(ingestion, "ingestion_service", service)
+
+    async def run():
+        service.start([("BTCUSDT", "1m")])
+        while not service.feed_failures:
+            await asyncio.sleep(0)
+        degraded = await health()
+        await asyncio.wait_for(service._runner, 5)
+        return degraded, await health()
+
+    degraded, finished = asyncio.run(run())
+    assert degraded["status"] == "degraded" and degraded["ingestion"]["feed_error"] == "ConnectionResetError: feed dropped"
+    assert finished["ingestion"] == {"running": False, "streams": 1, "feed_failures": 1, "feed_error": None}
+
+
+def test_defaults_follow_settings_changed_after_import(monkeypatch):
+    monkeypatch.setattr(settings, "ingestion_history_bars", 123)
+    monkeypatch.setattr(settings, "ingestion_max_streams", 4)
+    monkeypatch.setattr(settings, "ingestion_auto_track", False)
+    feed = ReplayFeed({}, warm_bars=0)
+    service = IngestionService(feed, feed)
+    assert (service.history_bars, service.max_streams) == (123, 4)
+    assert LiveConnector(service, ingestion.BinanceConnector()).auto_track is False
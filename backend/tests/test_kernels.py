@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core import kernels
+
+WINDOW = 14
+
+
+@pytest.fixture
+def prices() -> np.ndarray:
+    """(bars x series) random walks with NaN gaps, runs of repeated values and a price gap."""
+    rng = np.random.default_rng(42)
+    x = 100 * np.cumprod(1 + rng.normal(0, 0.01, (3000, 3)), axis=0)
+    x[500:540, 0] = x[499, 0]
+    x[1200:1203, 1] = np.nan
+    x[2000, 2] = np.nan
+    x[2500:, 2] *= 1.5
+    return x
+
+
+def assert_matches(actual: np.ndarray, expected: np.ndarray, rtol: float = 1e-12) -> None:
+    np.testing.assert_allclose(actual, expected, rtol=rtol, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("ddof", [0, 1])
+def test_rolling_moments(use_numba, prices, ddof):
+    mean, var = kernels.rolling_moments(prices, WINDOW, ddof)
+    rolling = pd.DataFrame(prices).rolling(WINDOW)
+    assert_matches(mean, rolling.mean().to_numpy())
+    # The cumulative-sum fallback and pandas' online updates round differently; both stay within ~1e-9 of a two-pass variance.
+    assert_matches(var, rolling.var(ddof=ddof).to_numpy(), rtol=1e-8)
+    # Constant windows are exact, as in pandas.
+    assert (mean[540 - 1, 0], var[540 - 1, 0]) == (prices[499, 0], 0.0)
+
+
+def test_rolling_mean(use_numba, prices):
+    assert_matches(kernels.rolling_mean(prices, WINDOW), pd.DataFrame(prices).rolling(WINDOW).mean().to_numpy())
+    assert_matches(kernels.rolling_mean(prices[:, 0], WINDOW), pd.Series(prices[:, 0]).rolling(WINDOW).mean().to_numpy())
+
+
+def test_rolling_extremes(prices):
+    rolling = pd.DataFrame(prices).rolling(WINDOW)
+    assert_matches(kernels.rolling_max(prices, WINDOW), rolling.max().to_numpy())
+    assert_matches(kernels.rolling_min(prices, WINDOW), rolling.min().to_numpy())
+
+
+def test_ewm_mean(use_numba, prices):
+    assert_matches(kernels.ewm_mean(prices, WINDOW), pd.DataFrame(prices).ewm(span=WINDOW, adjust=False).mean().to_numpy())
+
+
+def test_true_range(prices):
+    rng = np.random.default_rng(7)
+    close = prices[:, 0]
+    high = close * (1 + rng.uniform(0, 0.01, len(close)))
+    low = close * (1 - rng.uniform(0, 0.01, len(close)))
+    prev = pd.Series(close).shift()
+    expected = pd.concat([pd.Series(high - low), (pd.Series(high) - prev).abs(), (pd.Series(low) - prev).abs()], axis=1).max(axis=1)
+    assert_matches(kernels.true_range(high, low, close), expected.to_numpy())
+
+
+def test_short_input(use_numba):
+    x = np.arange(5.0)
+    mean, var = kernels.rolling_moments(x, WINDOW)
+    assert np.isnan(mean).all() and np.isnan(var).all()
+    assert np.isnan(kernels.rolling_max(x, WINDOW)).all()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.core.config import settings
+from app.research import pipeline
+from app.strategies.generator import base_strategies
+
+
+def test_strategy_pool_fans_out_every_concurrent_asset(monkeypatch):
+    monkeypatch.setattr(settings, "research_workers", 3)
+    specs = base_strategies()
+    running = set()
+    peak = 0
+    lock = threading.Lock()
+
+    def tune(spec):
+        nonlocal peak
+        with lock:
+            running.add(threading.get_ident())
+            peak = max(peak, len(running))
+        time.sleep(0.05)
+        with lock:
+            running.discard(threading.get_ident())
+        return spec
+
+    assets = [threading.Thread(target=pipeline._optimize_all, args=(specs, tune, True)) for _ in range(3)]
+    for thread in assets:
+        thread.start()
+    for thread in assets:
+        thread.join()
+    assert pipeline._strategy_pool_workers == 3 * len(specs)
+    assert peak == 3 * len(specs)
+
+
+def test_strategy_pool_follows_research_workers(monkeypatch):
+    monkeypatch.setattr(settings, "research_workers", 2)
+    assert pipeline._strategy_executor(5)._max_workers == 10
+    monkeypatch.setattr(settings, "research_workers", 4)
+    assert pipeline._strategy_executor(5)._max_workers == 20
+    assert pipeline.ResearchExecutor().max_workers == 4 and pipeline.ResearchExecutor(max_workers=1).max_workers == 1
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.metrics import request_timings, span
+from app.core.profiling import SamplingProfiler, active_profiler, in_request_context
+
+
+def busy_stage(seconds: float = 0.05) -> None:
+    with span("busy_stage"):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+
+def unrelated_work(stop: threading.Event) -> None:
+    while not stop.is_set():
+        pass
+
+
+def test_pool_threads_record_into_the_request_timings():
+    token = request_timings.set({})
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(in_request_context(busy_stage), [0.01, 0.01]))
+            pool.submit(busy_stage, 0.01).result()  # not bound: lost, as before
+        assert len(request_timings.get()["busy_stage"]) == 2
+    finally:
+        request_timings.reset(token)
+
+
+def test_profiler_samples_only_the_request_threads():
+    stop = threading.Event()
+    other = threading.Thread(target=unrelated_work, args=(stop,))
+    other.start()
+    profiler = SamplingProfiler(interval_s=0.002)
+    token = active_profiler.set(profiler)
+    try:
+        profiler.start()
+        with ThreadPoolExecutor(1) as pool:
+            pool.submit(in_request_context(busy_stage), 0.1).result()
+        samples = profiler.stop()
+    finally:
+        active_profiler.reset(token)
+        stop.set()
+        other.join()
+    assert any(stack.endswith("test_profiling.py:busy_stage") for stack in samples)
+    assert not any("unrelated_work" in stack for stack in samples)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from app.data.connectors import SyntheticConnector
+from app.strategies import indicators
+from app.strategies.generator import base_strategies, generate_signals
+from app.strategies.streaming import (
+    StreamingATR,
+    StreamingBollinger,
+    StreamingEMA,
+    StreamingMACD,
+    StreamingOBV,
+    StreamingRSI,
+    StreamingSMA,
+    StreamingStochastic,
+    replay_signals,
+)
+
+TUNED = {
+    "ema_trend_rsi": {"fast": 9, "slow": 80, "rsi_low": 40, "rsi_high": 60},
+    "bollinger_reversion": {"window": 30, "std": 1.5},
+    "obv_trend_confirm": {"ma_window": 7},
+}
+
+
+@pytest.fixture(scope="module", params=["EUR_USD", "ES1!"])
+def candles(request):
+    return asyncio.run(SyntheticConnector("oanda").fetch_ohlcv(request.param, "1h", 2000))
+
+
+@pytest.mark.parametrize("spec", base_strategies(), ids=lambda spec: spec.name)
+def test_replay_matches_generate_signals(candles, spec):
+    expected = generate_signals(candles, spec, cache=None)
+    np.testing.assert_array_equal(replay_signals(candles, spec).to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize("name", sorted(TUNED))
+def test_replay_matches_generate_signals_with_tuned_params(candles, name):
+    spec = next(spec for spec in base_strategies() if spec.name == name)
+    spec = replace(spec, params=spec.params | TUNED[name])
+    np.testing.assert_array_equal(replay_signals(candles, spec).to_numpy(), generate_signals(candles, spec, cache=None).to_numpy())
+
+
+@pytest.fixture(params=[False, True], ids=["clean", "nan_gap"])
+def columns(candles, request) -> dict[str, np.ndarray]:
+    """2000 bars, far longer than any ring buffer; optionally with a run of missing closes mid-series."""
+    cols = {c: np.array(candles[c], dtype=float) for c in ("high", "low", "close", "volume")}
+    if request.param:
+        cols["close"][700:705] = np.nan
+    return cols
+
+
+def stream(indicator, *cols: np.ndarray) -> np.ndarray:
+    return np.array([indicator.update(*values) for values in zip(*cols)], dtype=float)
+
+
+def assert_matches(actual: np.ndarray, expected) -> None:
+    np.testing.assert_allclose(actual, np.asarray(expected, dtype=float), rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("window", [2, 20, 50])
+def test_streaming_sma(use_numba, columns, window):
+    actual = stream(StreamingSMA(window), columns["close"])
+    assert np.isnan(actual[: window - 1]).all() and not np.isnan(actual[window - 1])
+    assert_matches(actual, indicators.sma(columns["close"], window))
+
+
+@pytest.mark.parametrize("window", [9, 20, 200])
+def test_streaming_ema(use_numba, columns, window):
+    assert_matches(stream(StreamingEMA(window), columns["close"]), indicators.ema(columns["close"], window))
+
+
+def test_streaming_macd(use_numba, columns):
+    line, signal = stream(StreamingMACD(), columns["close"]).T
+    expected_line, expected_signal = indicators.macd(columns["close"])
+    assert_matches(line, expected_line)
+    assert_matches(signal, expected_signal)
+
+
+def test_streaming_rsi(use_numba, columns):
+    actual = stream(StreamingRSI(), columns["close"])
+    assert np.isnan(actual[:14]).all()
+    assert_matches(actual, indicators.rsi(columns["close"]))
+
+
+def test_streaming_stochastic(use_numba, columns):
+    cols = (columns["high"], columns["low"], columns["close"])
+    assert_matches(stream(StreamingStochastic(), *cols), indicators.stochastic(*cols))
+
+
+def test_streaming_atr(use_numba, columns):
+    cols = (columns["high"], columns["low"], columns["close"])
+    assert_matches(stream(StreamingATR(), *cols), indicators.atr(*cols))
+
+
+def test_streaming_bollinger(use_numba, columns):
+    upper, lower = stream(StreamingBollinger(30, 1.5), columns["close"]).T
+    expected_upper, expected_lower = indicators.bollinger(columns["close"], 30, 1.5)
+    assert np.isnan(upper[:29]).all()
+    assert_matches(upper, expected_upper)
+    assert_matches(lower, expected_lower)
+
+
+def test_streaming_obv(use_numba, columns):
+    assert_matches(stream(StreamingOBV(), columns["close"], columns["volume"]), indicators.obv(columns["close"], columns["volume"]))